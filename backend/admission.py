@@ -0,0 +1,91 @@
+"""Admission control for CPU-heavy audio conversion."""
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from config import settings
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; carries a suggested retry delay."""
+    def __init__(self, retry_after: int):
+        super().__init__(f"Server busy, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Limits how many conversions run at once and how many may wait.
+    
+    Requests beyond max_concurrent wait in a queue of at most max_queue;
+    anything beyond that (or waiting longer than queue_timeout) is rejected
+    immediately with a Retry-After estimated from recent conversion times.
+    All state is touched only from the event loop thread.
+    """
+    
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float,
+                 initial_duration: float = 2.0):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        # Exponentially weighted average of conversion time, in seconds
+        self.avg_duration = initial_duration
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+    
+    def retry_after(self) -> int:
+        """Estimate seconds until a new request would be admitted."""
+        backlog = self.active + self.waiting + 1
+        return max(1, math.ceil(self.avg_duration * backlog / self.max_concurrent))
+    
+    def _reject(self):
+        self.rejected += 1
+        raise AdmissionRejected(self.retry_after())
+    
+    @asynccontextmanager
+    async def admit(self):
+        """Hold a conversion slot for the duration of the block, or raise AdmissionRejected."""
+        if self._semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self._reject()
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._reject()
+            finally:
+                self.waiting -= 1
+        else:
+            # A slot is free: acquire() returns without suspending
+            await self._semaphore.acquire()
+        
+        self.active += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.avg_duration = 0.8 * self.avg_duration + 0.2 * elapsed
+            self.active -= 1
+            self._semaphore.release()
+    
+    def status(self) -> dict:
+        """Current load, for diagnostics."""
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "avg_duration_s": round(self.avg_duration, 3)
+        }
+
+
+# Global admission controller for audio conversion
+conversion_admission = AdmissionController(
+    max_concurrent=settings.conversion_max_concurrent,
+    max_queue=settings.conversion_max_queue,
+    queue_timeout=settings.conversion_queue_timeout
+)
@@ -1,9 +1,28 @@
 """Audio conversion utilities using ffmpeg."""
+import asyncio
+import hashlib
+import os
+import uuid
+import wave
 import subprocess
 import shutil
 from pathlib import Path
 from datetime import datetime
-from typing import Tuple
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
+import numpy as np
+from config import settings
+from admission import AdmissionController, AdmissionRejected, conversion_admission
+
+
+# Output format for all recordings: 16-bit PCM, 16kHz, mono WAV
+WAV_OUTPUT_ARGS = ["-acodec", "pcm_s16le", "-ar", "16000", "-ac", "1"]
+
+# Prefix of temporary upload files, so stale ones can be found and cleaned up
+UPLOAD_TEMP_PREFIX = "voxupload_"
+
+# Suffix of reconvert_recordings.py outputs in progress; deliberately not .wav,
+# so reconcile.py cannot take them for recordings
+RECONVERT_SUFFIX = ".reconvert.tmp"
 
 
 def check_ffmpeg_installed() -> bool:
@@ -38,6 +57,71 @@ def generate_filename(username: str, language: str, task_type: str, role: str, i
     return filename
 
 
+def get_recording_path(username: str, filename: str, create: bool = True) -> Path:
+    """
+    Get the sharded storage path for a recording.
+    
+    Files are nested two hex digits per level of the username's SHA-1 hash
+    (recordings_shard_depth levels), so no single directory grows unbounded.
+    The parent directory is created unless create is False.
+    """
+    digest = hashlib.sha1(username.encode("utf-8")).hexdigest()
+    shard_dir = settings.recordings_dir
+    for level in range(settings.recordings_shard_depth):
+        shard_dir = shard_dir / digest[level * 2:level * 2 + 2]
+    if create:
+        shard_dir.mkdir(parents=True, exist_ok=True)
+    return shard_dir / filename
+
+
+def is_valid_wav_header(header: bytes) -> bool:
+    """Check that the first bytes of a file form a RIFF/WAVE header with a fmt chunk."""
+    return (
+        len(header) >= 44 and
+        header[0:4] == b"RIFF" and
+        header[8:12] == b"WAVE" and
+        header[12:16] == b"fmt "
+    )
+
+
+def read_wav_samples(source: Union[Path, BinaryIO]) -> Tuple[np.ndarray, int]:
+    """Read a 16-bit PCM WAV as mono int16 samples, returning (samples, sample_rate)."""
+    with wave.open(str(source) if isinstance(source, Path) else source, "rb") as wav:
+        sample_rate = wav.getframerate()
+        channels = wav.getnchannels()
+        if wav.getsampwidth() != 2:
+            raise ValueError("Only 16-bit PCM WAV files are supported")
+        frames = wav.readframes(wav.getnframes())
+    
+    samples = np.frombuffer(frames, dtype="<i2")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples, sample_rate
+
+
+def compute_waveform_peaks(source: Union[Path, BinaryIO], samples_per_bin: int = 160) -> Dict:
+    """
+    Summarize a 16-bit PCM WAV as per-bin min/max peaks for drawing waveforms.
+    
+    The default of 160 samples per bin is 10 ms at 16 kHz. Peaks are scaled
+    to -1.0..1.0 and rounded, so the summary stays small.
+    """
+    samples, sample_rate = read_wav_samples(source)
+    
+    num_bins = -(-len(samples) // samples_per_bin)
+    padded = np.zeros(num_bins * samples_per_bin, dtype=np.int16)
+    padded[:len(samples)] = samples
+    bins = padded.reshape(num_bins, samples_per_bin) / 32768.0
+    
+    return {
+        "sample_rate": sample_rate,
+        "duration_seconds": round(len(samples) / sample_rate, 3) if sample_rate else 0.0,
+        "samples_per_bin": samples_per_bin,
+        "min": np.round(bins.min(axis=1), 3).tolist() if num_bins else [],
+        "max": np.round(bins.max(axis=1), 3).tolist() if num_bins else []
+    }
+
+
 def convert_to_wav(input_path: Path, output_path: Path) -> Tuple[bool, str]:
     """
     Convert audio file to WAV format using ffmpeg.
@@ -62,9 +146,7 @@ def convert_to_wav(input_path: Path, output_path: Path) -> Tuple[bool, str]:
         cmd = [
             "ffmpeg",
             "-i", str(input_path),
-            "-acodec", "pcm_s16le",
-            "-ar", "16000",
-            "-ac", "1",
+            *WAV_OUTPUT_ARGS,
             "-y",
             str(output_path)
         ]
@@ -88,3 +170,218 @@ def convert_to_wav(input_path: Path, output_path: Path) -> Tuple[bool, str]:
     except Exception as e:
         return False, f"Conversion error: {str(e)}"
 
+
+def convert_batch_to_wav(jobs: List[Tuple[Path, Path]]) -> List[Tuple[bool, str]]:
+    """
+    Convert several audio files to WAV with a single ffmpeg invocation.
+    
+    Each input gets its own -i and is mapped to its own output, so process
+    start-up is paid once per batch instead of once per file. If the batch
+    fails (e.g. one corrupt input), every file is retried on its own so the
+    result for each is reported separately.
+    
+    Args:
+        jobs: List of (input_path, output_path) pairs
+    
+    Returns:
+        List of (success: bool, message: str), one per job, in order
+    """
+    if not jobs:
+        return []
+    if len(jobs) == 1:
+        return [convert_to_wav(*jobs[0])]
+    if not check_ffmpeg_installed():
+        return [(False, "ffmpeg is not installed. Please install ffmpeg to convert audio files.")] * len(jobs)
+    
+    cmd = ["ffmpeg"]
+    for input_path, _ in jobs:
+        cmd += ["-i", str(input_path)]
+    for index, (_, output_path) in enumerate(jobs):
+        # Explicit format: outputs need not end in .wav (e.g. temp files)
+        cmd += ["-map", f"{index}:a:0", *WAV_OUTPUT_ARGS, "-f", "wav", "-y", str(output_path)]
+    
+    try:
+        result = subprocess.run(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=30 + 5 * len(jobs)
+        )
+        batch_ok = result.returncode == 0
+    except subprocess.TimeoutExpired:
+        batch_ok = False
+    
+    if batch_ok and all(output_path.exists() for _, output_path in jobs):
+        return [(True, "Conversion successful")] * len(jobs)
+    
+    # Isolate the failing input(s)
+    return [convert_to_wav(input_path, output_path) for input_path, output_path in jobs]
+
+
+class BatchConverter:
+    """
+    Groups conversions requested close together into one ffmpeg run.
+    
+    convert() waits up to window_seconds for other requests to join the
+    batch (or until max_batch_size is reached), then converts them all in a
+    worker thread with convert_batch_to_wav(). If an admission controller
+    is given, each batch holds one of its slots while ffmpeg runs, so the
+    concurrency limit counts ffmpeg processes rather than queued files;
+    AdmissionRejected is raised from convert() for every file in a
+    rejected batch.
+    """
+    
+    def __init__(self, window_seconds: float, max_batch_size: int,
+                 admission: Optional[AdmissionController] = None):
+        self.window_seconds = window_seconds
+        self.max_batch_size = max(1, max_batch_size)
+        self.admission = admission
+        self._pending: List[Tuple[Path, Path, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+    
+    async def convert(self, input_path: Path, output_path: Path) -> Tuple[bool, str]:
+        """Queue one conversion and wait for its batch to finish."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((input_path, output_path, future))
+        
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+        
+        return await future
+    
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            # Keep a reference so the task is not garbage collected mid-run
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, batch: List[Tuple[Path, Path, asyncio.Future]]):
+        jobs = [(i, o) for i, o, _ in batch]
+        try:
+            if self.admission is not None:
+                async with self.admission.admit():
+                    results = await asyncio.to_thread(convert_batch_to_wav, jobs)
+            else:
+                results = await asyncio.to_thread(convert_batch_to_wav, jobs)
+        except AdmissionRejected as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except Exception as e:
+            results = [(False, f"Conversion error: {str(e)}")] * len(batch)
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class StreamingWavConverter:
+    """
+    Converts audio to WAV while it is still being received.
+    
+    A long-lived ffmpeg process reads the encoded stream (e.g. MediaRecorder
+    webm/opus chunks) from stdin and writes the WAV as it goes, so when the
+    last chunk arrives only the tail remains to be decoded. Output goes to a
+    unique partial file that is renamed to output_path once ffmpeg succeeds.
+    """
+    
+    def __init__(self, output_path: Path):
+        self.output_path = output_path
+        self._partial_path = output_path.with_name(f"{output_path.name}.{uuid.uuid4().hex[:8]}.part")
+        self.finished = False
+        self.success = False
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._stderr_task: Optional[asyncio.Task] = None
+        self._stderr_tail = b""
+    
+    async def start(self) -> Tuple[bool, str]:
+        """Launch the ffmpeg decoder."""
+        if not check_ffmpeg_installed():
+            return False, "ffmpeg is not installed. Please install ffmpeg to convert audio files."
+        
+        cmd = ["ffmpeg", "-i", "pipe:0", *WAV_OUTPUT_ARGS, "-f", "wav", "-y", str(self._partial_path)]
+        self._process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        # Drain stderr continuously so ffmpeg never blocks on a full pipe
+        self._stderr_task = asyncio.create_task(self._drain_stderr())
+        return True, "Streaming conversion started"
+    
+    async def _drain_stderr(self):
+        while True:
+            chunk = await self._process.stderr.read(4096)
+            if not chunk:
+                break
+            self._stderr_tail = (self._stderr_tail + chunk)[-2000:]
+    
+    async def write(self, chunk: bytes) -> bool:
+        """Feed a chunk of encoded audio; returns False if ffmpeg has exited."""
+        if self._process is None or self._process.returncode is not None:
+            return False
+        try:
+            self._process.stdin.write(chunk)
+            await self._process.stdin.drain()
+            return True
+        except (BrokenPipeError, ConnectionResetError):
+            return False
+    
+    async def finish(self, timeout: float = 30) -> Tuple[bool, str]:
+        """Signal end of input and wait for ffmpeg to finalize the WAV."""
+        if self.finished:
+            return self.success, "Conversion already finished"
+        self.finished = True
+        if self._process is None:
+            return False, "Conversion was not started"
+        
+        try:
+            self._process.stdin.close()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        
+        try:
+            await asyncio.wait_for(self._process.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            await self.abort()
+            return False, "Conversion timed out (file too large or slow system)"
+        await self._stderr_task
+        
+        if self._process.returncode == 0:
+            os.replace(self._partial_path, self.output_path)
+            self.success = True
+            return True, "Conversion successful"
+        error_msg = self._stderr_tail.decode('utf-8', errors='ignore')
+        return False, f"ffmpeg error: {error_msg[-200:]}"
+    
+    async def abort(self):
+        """Kill ffmpeg if still running and remove this session's output."""
+        if self._process is not None and self._process.returncode is None:
+            self._process.kill()
+            await self._process.wait()
+        if self._stderr_task is not None:
+            await self._stderr_task
+        if self._partial_path.exists():
+            self._partial_path.unlink()
+        if self.success and self.output_path.exists():
+            self.output_path.unlink()
+        self.finished = True
+        self.success = False
+
+
+# Global batch converter (used for uploads when conversion_batch_window_ms > 0)
+batch_converter = BatchConverter(
+    window_seconds=settings.conversion_batch_window_ms / 1000,
+    max_batch_size=settings.conversion_batch_max_size,
+    admission=conversion_admission
+)
@@ -0,0 +1,164 @@
+"""Online SQLite backups that do not block writers."""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+from config import settings
+
+
+class DatabaseBackup:
+    """
+    Snapshots the database with SQLite's online backup API.
+    
+    Pages are copied a bounded number at a time, pausing between steps (in
+    the progress callback, which runs after every step) so writers (uploads)
+    only ever wait for one small step. If another connection writes to the
+    database mid-backup, SQLite restarts the copy from the first page, so a
+    busy database may take several passes; a backup still running after
+    max_seconds is abandoned and marked failed, so that steady writes cannot
+    keep it running forever and block later scheduled runs. Snapshots are
+    written under a temporary name, renamed when complete, and the oldest
+    are removed beyond the configured count.
+    """
+    
+    def __init__(self, db_path: Path, backup_dir: Path, pages_per_step: int,
+                 step_sleep: float, keep: int, max_seconds: float):
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.pages_per_step = max(1, pages_per_step)
+        self.step_sleep = step_sleep
+        self.keep = max(1, keep)
+        self.max_seconds = max_seconds
+        self._deadline = None
+        self._lock = threading.Lock()
+        self._status: Dict = {"state": "idle"}
+    
+    @property
+    def running(self) -> bool:
+        return self._status.get("state") == "running"
+    
+    def status(self) -> Dict:
+        """Current/last backup status and the snapshots on disk."""
+        status = dict(self._status)
+        status["snapshots"] = [
+            {"filename": path.name, "size_bytes": path.stat().st_size}
+            for path in self.list_snapshots()
+        ]
+        return status
+    
+    def list_snapshots(self) -> List[Path]:
+        """Completed snapshots, newest first."""
+        if not self.backup_dir.exists():
+            return []
+        return sorted(self.backup_dir.glob("db_*.sqlite3"), reverse=True)
+    
+    def start(self) -> bool:
+        """Run a backup in a background thread; returns False if one is already running."""
+        if not self._lock.acquire(blocking=False):
+            return False
+        final_path = self._begin()
+        thread = threading.Thread(target=self._run_locked, args=(final_path,), name="db-backup", daemon=True)
+        thread.start()
+        return True
+    
+    def _run_locked(self, final_path: Path):
+        try:
+            self._run(final_path)
+        finally:
+            self._lock.release()
+    
+    def _begin(self) -> Path:
+        """Mark a backup as running and choose its snapshot path."""
+        timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        final_path = self.backup_dir / f"db_{timestamp}.sqlite3"
+        self._status = {
+            "state": "running",
+            "started_at": datetime.utcnow().isoformat(),
+            "path": str(final_path),
+            "pages_total": None,
+            "pages_remaining": None,
+            "passes": 1
+        }
+        return final_path
+    
+    def _progress(self, status, remaining, total):
+        previous = self._status["pages_remaining"]
+        if previous is not None and remaining > previous:
+            # Another connection wrote to the database; SQLite started over
+            self._status["passes"] += 1
+        self._status["pages_total"] = total
+        self._status["pages_remaining"] = remaining
+        if self._deadline is not None and remaining and time.perf_counter() > self._deadline:
+            # Raising from the callback makes backup() abort the copy
+            raise TimeoutError(
+                f"Backup did not finish within {self.max_seconds:g}s "
+                f"({self._status['passes']} passes; concurrent writes restart the copy)"
+            )
+        # backup()'s own sleep argument only applies when a step hits SQLITE_BUSY
+        # or SQLITE_LOCKED; this is what spaces out the steps
+        if remaining and self.step_sleep > 0:
+            time.sleep(self.step_sleep)
+    
+    def _run(self, final_path: Path):
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        temp_path = final_path.with_suffix(".sqlite3.tmp")
+        started = time.perf_counter()
+        self._deadline = started + self.max_seconds if self.max_seconds > 0 else None
+        
+        source = sqlite3.connect(str(self.db_path))
+        destination = sqlite3.connect(str(temp_path))
+        try:
+            source.backup(
+                destination,
+                pages=self.pages_per_step,
+                progress=self._progress
+            )
+            destination.close()
+            os.replace(temp_path, final_path)
+            self._status.update({
+                "state": "succeeded",
+                "finished_at": datetime.utcnow().isoformat(),
+                "duration_seconds": round(time.perf_counter() - started, 3),
+                "size_bytes": final_path.stat().st_size
+            })
+            print(f"Database backup written to {final_path}")
+            self._rotate()
+        except Exception as e:
+            destination.close()
+            if temp_path.exists():
+                temp_path.unlink()
+            self._status.update({
+                "state": "failed",
+                "finished_at": datetime.utcnow().isoformat(),
+                "error": str(e)
+            })
+            print(f"Database backup failed: {e}")
+        finally:
+            source.close()
+    
+    def _rotate(self):
+        for old in self.list_snapshots()[self.keep:]:
+            old.unlink()
+
+
+async def run_backup_schedule(backup: DatabaseBackup, interval_hours: float):
+    """Start a backup every interval_hours, for the lifetime of the app."""
+    while True:
+        await asyncio.sleep(interval_hours * 3600)
+        if not backup.start():
+            print("Scheduled database backup skipped: a backup is already running")
+
+
+# Global database backup instance
+database_backup = DatabaseBackup(
+    db_path=settings.db_path,
+    backup_dir=settings.backup_dir,
+    pages_per_step=settings.backup_pages_per_step,
+    step_sleep=settings.backup_step_sleep,
+    keep=settings.backup_keep,
+    max_seconds=settings.backup_max_seconds
+)
@@ -0,0 +1,205 @@
+"""Micro-benchmarks for the per-request hot paths.
+
+Populates a temporary SQLite database with a synthetic dataset and times
+progress computation, task assignment and data/instruction lookups.
+Results are written as JSON so runs can be compared across commits.
+
+Usage:
+    python benchmark.py --users 2000 --recordings 40000 --output bench.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+
+def _prepare_environment(work_dir: Path):
+    """Point settings at a throwaway data directory before anything imports config."""
+    os.environ["DATA_DIR"] = str(work_dir)
+    os.environ["DB_PATH"] = str(work_dir / "bench.sqlite3")
+    os.environ["RECORDINGS_DIR"] = str(work_dir / "recordings")
+
+
+def _git_commit() -> str:
+    """Return the current git commit hash, or an empty string outside a checkout."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=Path(__file__).parent,
+            timeout=5
+        )
+        return result.stdout.decode().strip()
+    except Exception:
+        return ""
+
+
+def populate(num_users: int, num_recordings: int, seed: int) -> List[str]:
+    """Insert synthetic users and recordings, returning the generated usernames."""
+    from database import SessionLocal, User, Recording, init_db
+    from data_loader import data_loader
+
+    init_db()
+    rng = random.Random(seed)
+    usernames = [f"bench_user_{i:06d}" for i in range(num_users)]
+
+    # Weighted mix roughly matching real sessions: mostly pairs, some extras and instructions
+    task_mix = [("pair", "secret"), ("pair", "question"), ("extra_question", "question"),
+                ("instruction", "nobody"), ("instruction", "onlyme")]
+    weights = [35, 35, 15, 8, 7]
+
+    db = SessionLocal()
+    try:
+        db.bulk_save_objects([User(username=u) for u in usernames])
+        db.commit()
+
+        rows = []
+        for _ in range(num_recordings):
+            username = rng.choice(usernames)
+            language = rng.choice(["zh", "en"])
+            task_type, role = rng.choices(task_mix, weights=weights)[0]
+            if task_type == "instruction":
+                item_id = f"{language}_{role}_{rng.randrange(25)}"
+            else:
+                item_id = rng.choice(data_loader.get_items(language)).item_id
+            rows.append(Recording(
+                username=username,
+                language=language,
+                task_type=task_type,
+                role=role,
+                item_id=item_id,
+                file_path=f"/dev/null/{username}_{item_id}.wav"
+            ))
+        db.bulk_save_objects(rows)
+        db.commit()
+    finally:
+        db.close()
+
+    return usernames
+
+
+def _summarize(samples: List[float]) -> Dict:
+    """Reduce raw timings (seconds) to summary statistics in microseconds."""
+    ordered = sorted(samples)
+    p95_index = max(0, int(round(0.95 * len(ordered))) - 1)
+    return {
+        "iterations": len(ordered),
+        "mean_us": statistics.fmean(ordered) * 1e6,
+        "median_us": statistics.median(ordered) * 1e6,
+        "p95_us": ordered[p95_index] * 1e6,
+        "min_us": ordered[0] * 1e6,
+        "max_us": ordered[-1] * 1e6,
+    }
+
+
+def _time_calls(func: Callable, args_list: List[tuple]) -> Dict:
+    """Time one call of func per entry in args_list."""
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - start)
+    return _summarize(samples)
+
+
+def run_benchmarks(usernames: List[str], iterations: int, seed: int) -> Dict:
+    """Time each hot path over a random sample of users."""
+    from database import SessionLocal, get_user_progress
+    from data_loader import data_loader
+    from instruction_loader import instruction_loader
+    from task_manager import task_manager
+
+    rng = random.Random(seed + 1)
+    sample_users = [rng.choice(usernames) for _ in range(iterations)]
+    results = {}
+
+    db = SessionLocal()
+    try:
+        results["get_user_progress"] = _time_calls(
+            lambda u: get_user_progress(db, u),
+            [(u,) for u in sample_users]
+        )
+        results["get_next_task"] = _time_calls(
+            lambda u: task_manager.get_next_task(db, u),
+            [(u,) for u in sample_users]
+        )
+    finally:
+        db.close()
+
+    item_args = []
+    for _ in range(iterations):
+        language = rng.choice(["zh", "en"])
+        item_args.append((language, rng.choice(data_loader.get_items(language)).item_id))
+    results["get_item_by_id"] = _time_calls(data_loader.get_item_by_id, item_args)
+
+    # Cold calls assign instructions for a user for the first time; warm calls hit the cache
+    inst_types = ["zh_nobody", "zh_onlyme", "en_nobody", "en_onlyme"]
+    instruction_loader.user_assignments.clear()
+    cold_args = [(f"bench_inst_{i:06d}", rng.choice(inst_types)) for i in range(iterations)]
+    results["get_user_instructions_cold"] = _time_calls(instruction_loader.get_user_instructions, cold_args)
+    results["get_user_instructions_warm"] = _time_calls(instruction_loader.get_user_instructions, cold_args)
+
+    return results
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark backend hot paths")
+    parser.add_argument("--users", type=int, default=2000, help="Number of synthetic users")
+    parser.add_argument("--recordings", type=int, default=40000, help="Number of synthetic recordings")
+    parser.add_argument("--iterations", type=int, default=500, help="Timed calls per benchmark")
+    parser.add_argument("--seed", type=int, default=1234, help="Random seed for the dataset")
+    parser.add_argument("--output", type=Path, default=None, help="Write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="voxbench_") as tmp:
+        _prepare_environment(Path(tmp))
+
+        # Loader start-up messages go to stderr so stdout stays valid JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            start = time.perf_counter()
+            usernames = populate(args.users, args.recordings, args.seed)
+            populate_seconds = time.perf_counter() - start
+
+            results = run_benchmarks(usernames, args.iterations, args.seed)
+
+            # Release the SQLite file before the temp directory is removed
+            from database import engine
+            engine.dispose()
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": {
+            "users": args.users,
+            "recordings": args.recordings,
+            "iterations": args.iterations,
+            "seed": args.seed,
+        },
+        "populate_seconds": populate_seconds,
+        "results": results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+        print(f"Wrote benchmark results to {args.output}")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
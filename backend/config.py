@@ -18,6 +18,11 @@ class Settings(BaseSettings):
     data_dir: Path = Path("/app/data") if Path("/app/data").exists() else base_dir
     
     recordings_dir: Path = data_dir / "recordings"
+    backup_dir: Path = data_dir / "backups"  # Database snapshots; point at a different disk if possible
+    feature_store_dir: Path = data_dir / "features"  # Memory-mapped log-mel features (feature_store.py)
+    # Recordings are nested under recordings_dir by hex digits of a hash of the
+    # username, e.g. depth 2 -> recordings/ab/cd/<file>.wav (0 = flat layout)
+    recordings_shard_depth: int = 2
     db_path: Path = data_dir / "db.sqlite3"
     
     # JSONL data files (auto-detect: Docker vs local)
@@ -51,6 +56,57 @@ class Settings(BaseSettings):
     en_pairs_quota: int = 20
     en_extra_quota: int = 10
     
+    # Upload admission control (ffmpeg conversions)
+    conversion_max_concurrent: int = 2  # Conversions running at once
+    conversion_max_queue: int = 8  # Uploads allowed to wait for a slot; beyond this -> 429
+    conversion_queue_timeout: float = 20.0  # Seconds an upload may wait before being rejected
+    conversion_batch_window_ms: int = 0  # Group uploads arriving within this window into one ffmpeg run (0 = off)
+    conversion_batch_max_size: int = 8  # Maximum files per batched ffmpeg run
+    
+    # Recording storage backend: "local" (recordings_dir) or "s3" (any S3-compatible service)
+    storage_backend: str = "local"
+    storage_s3_bucket: str = ""
+    storage_s3_prefix: str = "recordings"
+    storage_s3_endpoint_url: str = ""  # e.g. http://localhost:9000 for MinIO / moto_server
+    storage_s3_region: str = ""
+    storage_s3_access_key_id: str = ""  # Empty = use the default AWS credential chain
+    storage_s3_secret_access_key: str = ""
+    storage_s3_max_pool_connections: int = 20
+    storage_s3_multipart_threshold_mb: int = 8
+    storage_s3_create_bucket: bool = False  # Create the bucket on startup if missing
+    
+    # Storage/database reconciliation (reconcile.py)
+    reconcile_workers: int = 8  # Threads used to checksum files
+    reconcile_stale_hours: float = 24.0  # Temp/partial/export files older than this are removed; younger WAVs are never orphans
+    
+    # Online database backups
+    backup_interval_hours: float = 24.0  # Scheduled backup interval (0 disables the schedule)
+    backup_keep: int = 7  # Snapshots kept; older ones are deleted
+    backup_pages_per_step: int = 256  # Pages copied per step; writers wait at most one step
+    backup_step_sleep: float = 0.05  # Seconds to pause between steps
+    backup_max_seconds: float = 3600.0  # A backup still unfinished after this fails (writes restart it); 0 = no limit
+    
+    # Log-mel feature store
+    feature_extract_on_ingest: bool = False  # Compute features for each new recording as it is saved
+    feature_workers: int = 4  # Processes used by the extract_features.py backfill
+    
+    # Near-duplicate / replayed-audio detection
+    duplicate_max_distance: int = 32  # Fingerprint bits (of 256) that may differ for a near-duplicate (at most 32)
+    duplicate_flag_on_upload: bool = False  # Add possible_duplicate to upload responses
+    
+    # Live streaming ingest over WebSocket (one ffmpeg process per session)
+    stream_max_sessions: int = 20
+    
+    # Request profiling (opt-in, for diagnosing slow requests in production)
+    profiling_enabled: bool = False
+    profiling_sample_rate: float = 0.0  # Fraction of requests to profile (0.0 - 1.0)
+    profiling_header: str = "X-Debug-Profile"  # Requests carrying this header are always profiled
+    profiling_max_profiles: int = 50  # Most recent profiles kept in memory
+    
+    # SQL query instrumentation
+    slow_query_threshold_ms: float = 100.0  # Log statements slower than this (0 disables)
+    log_query_stats: bool = False  # Also print per-request query count/time (headers are always set)
+    
     # Instruction TXT files
     @property
     def zh_nobody_txt(self) -> Path:
@@ -0,0 +1,224 @@
+"""In-memory corpus coverage counts, maintained incrementally."""
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+from data_loader import data_loader
+from instruction_loader import instruction_loader
+
+LANGUAGES = ["zh", "en"]
+INSTRUCTION_TYPES = ["zh_nobody", "zh_onlyme", "en_nobody", "en_onlyme"]
+
+# Per-user item state bits
+SECRET_BIT = 1  # pair secret recorded
+QUESTION_BIT = 2  # pair question recorded
+EXTRA_BIT = 4  # extra question recorded
+PAIR_BITS = SECRET_BIT | QUESTION_BIT
+
+
+class _UserMatrix:
+    """
+    A (users x columns) uint8 matrix of state bits with a row per user.
+    Capacity doubles as users are added so inserts stay amortized O(1).
+    """
+
+    def __init__(self, num_columns: int, initial_rows: int = 64):
+        self.rows: Dict[str, int] = {}
+        self.data = np.zeros((initial_rows, num_columns), dtype=np.uint8)
+
+    def row(self, username: str) -> int:
+        index = self.rows.get(username)
+        if index is None:
+            index = len(self.rows)
+            if index >= self.data.shape[0]:
+                grown = np.zeros((self.data.shape[0] * 2, self.data.shape[1]), dtype=np.uint8)
+                grown[:self.data.shape[0]] = self.data
+                self.data = grown
+            self.rows[username] = index
+        return index
+
+    def used(self) -> np.ndarray:
+        return self.data[:len(self.rows)]
+
+
+class CorpusCoverage:
+    """
+    Per-item coverage counts for each language's corpus and each instruction file.
+
+    For every corpus item it keeps how many users have a complete pair, a
+    lone secret, a lone question and an extra question; for every instruction
+    line, how many users recorded it. Counts live in NumPy arrays indexed by
+    item position, are rebuilt from the recordings table in one vectorized
+    pass at startup and updated in O(1) on each new recording.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._item_index: Dict[str, Dict[str, int]] = {}
+        self._item_ids: Dict[str, List[str]] = {}
+        self._users: Dict[str, _UserMatrix] = {}
+        self._complete: Dict[str, np.ndarray] = {}
+        self._lone_secret: Dict[str, np.ndarray] = {}
+        self._lone_question: Dict[str, np.ndarray] = {}
+        self._extra: Dict[str, np.ndarray] = {}
+        self._instruction_users: Dict[str, _UserMatrix] = {}
+        self._instruction_counts: Dict[str, np.ndarray] = {}
+        self._reset()
+
+    def _reset(self):
+        for language in LANGUAGES:
+            item_ids = [item.item_id for item in data_loader.get_items(language)]
+            n = len(item_ids)
+            self._item_ids[language] = item_ids
+            self._item_index[language] = {item_id: i for i, item_id in enumerate(item_ids)}
+            self._users[language] = _UserMatrix(n)
+            self._complete[language] = np.zeros(n, dtype=np.int64)
+            self._lone_secret[language] = np.zeros(n, dtype=np.int64)
+            self._lone_question[language] = np.zeros(n, dtype=np.int64)
+            self._extra[language] = np.zeros(n, dtype=np.int64)
+        for inst_type in INSTRUCTION_TYPES:
+            n = len(instruction_loader.instructions.get(inst_type, []))
+            self._instruction_users[inst_type] = _UserMatrix(n)
+            self._instruction_counts[inst_type] = np.zeros(n, dtype=np.int64)
+
+    @staticmethod
+    def _bit(task_type: str, role: str) -> int:
+        if task_type == "pair":
+            return SECRET_BIT if role == "secret" else QUESTION_BIT if role == "question" else 0
+        if task_type == "extra_question":
+            return EXTRA_BIT
+        return 0
+
+    @staticmethod
+    def _instruction_position(item_id: str) -> Optional[tuple]:
+        """Split an instruction item id like 'zh_nobody_3' into ('zh_nobody', 3)."""
+        inst_type, _, index = item_id.rpartition("_")
+        if inst_type not in INSTRUCTION_TYPES or not index.isdigit():
+            return None
+        return inst_type, int(index)
+
+    def rebuild(self, db):
+        """Recompute all counts from the recordings table in one pass."""
+        from database import Recording
+        rows = db.query(
+            Recording.username, Recording.language, Recording.task_type, Recording.role, Recording.item_id
+        ).all()
+
+        with self._lock:
+            self._reset()
+
+            # Group column indices by matrix, then OR all bits in with one ufunc call each
+            updates: Dict[int, tuple] = {}
+            for username, language, task_type, role, item_id in rows:
+                if task_type == "instruction":
+                    position = self._instruction_position(item_id)
+                    if position is None:
+                        continue
+                    inst_type, column = position
+                    matrix = self._instruction_users[inst_type]
+                    if column >= matrix.data.shape[1]:
+                        continue
+                    bit = 1
+                else:
+                    bit = self._bit(task_type, role)
+                    column = self._item_index.get(language, {}).get(item_id)
+                    if not bit or column is None:
+                        continue
+                    matrix = self._users[language]
+                rows_, cols_, bits_ = updates.setdefault(id(matrix), (matrix, [], [], []))[1:]
+                rows_.append(matrix.row(username))
+                cols_.append(column)
+                bits_.append(bit)
+
+            for matrix, rows_, cols_, bits_ in updates.values():
+                np.bitwise_or.at(matrix.data, (np.array(rows_), np.array(cols_)), np.array(bits_, dtype=np.uint8))
+
+            for language in LANGUAGES:
+                state = self._users[language].used()
+                pair_state = state & PAIR_BITS
+                self._complete[language] = (pair_state == PAIR_BITS).sum(axis=0)
+                self._lone_secret[language] = (pair_state == SECRET_BIT).sum(axis=0)
+                self._lone_question[language] = (pair_state == QUESTION_BIT).sum(axis=0)
+                self._extra[language] = ((state & EXTRA_BIT) != 0).sum(axis=0)
+            for inst_type in INSTRUCTION_TYPES:
+                self._instruction_counts[inst_type] = self._instruction_users[inst_type].used().sum(axis=0, dtype=np.int64)
+
+    def record(self, username: str, language: str, task_type: str, role: str, item_id: str):
+        """Apply one new recording to the counts."""
+        with self._lock:
+            if task_type == "instruction":
+                position = self._instruction_position(item_id)
+                if position is None:
+                    return
+                inst_type, column = position
+                matrix = self._instruction_users[inst_type]
+                if column >= matrix.data.shape[1]:
+                    return
+                row = matrix.row(username)
+                if not matrix.data[row, column]:
+                    matrix.data[row, column] = 1
+                    self._instruction_counts[inst_type][column] += 1
+                return
+
+            bit = self._bit(task_type, role)
+            column = self._item_index.get(language, {}).get(item_id)
+            if not bit or column is None:
+                return
+            matrix = self._users[language]
+            row = matrix.row(username)
+            old = int(matrix.data[row, column])
+            new = old | bit
+            if new == old:
+                return
+            matrix.data[row, column] = new
+
+            if bit == EXTRA_BIT:
+                self._extra[language][column] += 1
+                return
+            # Move the user's pair state for this item from its old category to the new one
+            for state, delta in ((old & PAIR_BITS, -1), (new & PAIR_BITS, 1)):
+                if state == PAIR_BITS:
+                    self._complete[language][column] += delta
+                elif state == SECRET_BIT:
+                    self._lone_secret[language][column] += delta
+                elif state == QUESTION_BIT:
+                    self._lone_question[language][column] += delta
+
+    def report(self, language: str) -> Dict:
+        """Coverage matrix and totals for one language."""
+        with self._lock:
+            complete = self._complete[language].copy()
+            lone_secret = self._lone_secret[language].copy()
+            lone_question = self._lone_question[language].copy()
+            extra = self._extra[language].copy()
+            instructions = {
+                inst_type: self._instruction_counts[inst_type].tolist()
+                for inst_type in INSTRUCTION_TYPES if inst_type.startswith(f"{language}_")
+            }
+
+        items = [
+            {
+                "item_id": item_id,
+                "complete_pairs": int(complete[i]),
+                "lone_secrets": int(lone_secret[i]),
+                "lone_questions": int(lone_question[i]),
+                "extra_questions": int(extra[i])
+            }
+            for i, item_id in enumerate(self._item_ids[language])
+        ]
+        return {
+            "items": items,
+            "totals": {
+                "items": len(items),
+                "complete_pairs": int(complete.sum()),
+                "lone_secrets": int(lone_secret.sum()),
+                "lone_questions": int(lone_question.sum()),
+                "extra_questions": int(extra.sum()),
+                "items_without_complete_pair": int((complete == 0).sum()),
+                "min_complete_pairs": int(complete.min()) if len(complete) else 0
+            },
+            "instructions": instructions
+        }
+
+
+# Global corpus coverage instance
+corpus_coverage = CorpusCoverage()
@@ -1,5 +1,8 @@
 """Database models and operations."""
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import create_engine, event, inspect, text, Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -14,6 +17,52 @@ engine = create_engine(
     connect_args={"check_same_thread": False}  # Needed for SQLite
 )
 
+
+class QueryStats:
+    """Query count and total database time accumulated for one request."""
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+
+
+# Stats object for the current request. The object itself is mutated so that
+# queries run in threadpool workers (sync dependencies) are still counted.
+_current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+
+def start_query_stats() -> QueryStats:
+    """Begin collecting query stats for the current request context."""
+    stats = QueryStats()
+    _current_query_stats.set(stats)
+    return stats
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["query_start_times"].pop()) * 1000
+    
+    stats = _current_query_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.total_ms += elapsed_ms
+    
+    if settings.slow_query_threshold_ms > 0 and elapsed_ms >= settings.slow_query_threshold_ms:
+        print(f"Slow query ({elapsed_ms:.1f} ms): {statement} | params={parameters!r}")
+
+
+@event.listens_for(engine, "handle_error")
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_times"):
+        conn.info["query_start_times"].pop()
+
+
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -46,14 +95,53 @@ class Recording(Base):
     item_id = Column(String, nullable=False, index=True)  # ID from JSONL
     file_path = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    idempotency_key = Column(String, nullable=True)  # Client-generated per take, unique per user
+    sha256 = Column(String, nullable=True)  # File checksum, filled in by reconcile.py
+    fingerprint = Column(String, nullable=True)  # 256-bit spectral fingerprint (hex), see duplicate_index.py
     
     # Relationship to user
     user = relationship("User", back_populates="recordings")
+    
+    __table_args__ = (
+        Index("ix_recordings_username_idempotency_key", "username", "idempotency_key", unique=True),
+    )
+
+
+# Columns added after the initial schema: (table, column, SQL type).
+# create_all() does not alter existing tables, so init_db() adds these.
+_ADDED_COLUMNS = [
+    ("recordings", "idempotency_key", "VARCHAR"),
+    ("recordings", "sha256", "VARCHAR"),
+    ("recordings", "fingerprint", "VARCHAR"),
+]
+
+# Indexes from older versions that have been replaced
+_DROPPED_INDEXES = [
+    "ix_recordings_idempotency_key",  # globally unique; now unique per (username, idempotency_key)
+]
+
+
+def _migrate_columns():
+    """Bring tables created by older versions up to date: add columns and indexes, drop replaced indexes."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column, sql_type in _ADDED_COLUMNS:
+            existing = {col["name"] for col in inspector.get_columns(table)}
+            if column not in existing:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}"))
+                print(f"Added column {table}.{column}")
+        for index_name in _DROPPED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+    
+    for table in {table for table, _, _ in _ADDED_COLUMNS}:
+        for index in Base.metadata.tables[table].indexes:
+            index.create(bind=engine, checkfirst=True)
 
 
 def init_db():
     """Initialize the database, creating all tables."""
     Base.metadata.create_all(bind=engine)
+    _migrate_columns()
 
 
 def get_db():
@@ -0,0 +1,234 @@
+"""Spectral fingerprints and an in-memory index for near-duplicate recordings."""
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config import settings
+from feature_store import N_MELS
+
+# Fingerprints are 256 bits: one per cell of a 16 x 16 (time x band) energy grid
+GRID = 16
+FINGERPRINT_BYTES = GRID * GRID // 8
+
+# LSH banding: a fingerprint is a candidate if any 16-bit band matches exactly.
+# Band k takes the diagonal of cells (t, (t + k) % 16), one from every time
+# segment and mel band, since bits within a segment or band are correlated
+NUM_BANDS = GRID
+_BAND_ORDER = np.array([t * GRID + (t + k) % GRID for k in range(NUM_BANDS) for t in range(GRID)])
+
+# Largest distance the banding finds reliably: two fingerprints this far apart
+# still share a band about 90% of the time (99% at 24 bits), but only about
+# 40% at 48 bits. Larger distances would silently miss most pairs
+MAX_MATCH_DISTANCE = 32
+
+# Natural-log energy ranges: frames more than ~20 dB below the loudest are
+# trimmed from the ends, and bins are floored ~30 dB below the loudest bin
+TRIM_RANGE = 4.6
+FLOOR_RANGE = 6.9
+
+# Set-bit counts for every byte value
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint16)
+
+
+def fingerprint_from_features(features: np.ndarray) -> Optional[str]:
+    """
+    Reduce (frames, N_MELS) log-mel features to a 256-bit hex fingerprint.
+
+    Quiet ends are trimmed and the noise floor clamped, then the rest is
+    averaged into a 16 x 16 grid of equal time segments and mel bands. The
+    grid is centred per band (cancelling fixed channel colouring, as in a
+    replay through a speaker) and per segment (cancelling gain and loudness
+    contours), and each bit is the sign of one cell. A re-encoded or
+    replayed take lands a few bits from the original; unrelated speech
+    differs in about half. Returns None for clips too short or flat to
+    fingerprint.
+    """
+    mel = np.asarray(features, dtype=np.float32)
+    if mel.ndim != 2 or mel.shape[1] != N_MELS or not len(mel):
+        return None
+    energy = np.log(np.exp(mel.astype(np.float64)).sum(axis=1))
+    voiced = np.flatnonzero(energy >= energy.max() - TRIM_RANGE)
+    mel = np.maximum(mel[voiced[0]:voiced[-1] + 1], mel.max() - FLOOR_RANGE)
+    if len(mel) < GRID:
+        return None
+
+    time_edges = np.linspace(0, len(mel), GRID + 1).astype(int)
+    pooled = np.add.reduceat(mel, time_edges[:-1], axis=0) / np.diff(time_edges)[:, None]
+    band_edges = np.linspace(0, N_MELS, GRID + 1).astype(int)
+    grid = np.add.reduceat(pooled, band_edges[:-1], axis=1) / np.diff(band_edges)
+    grid = grid - grid.mean(axis=0)
+    grid = grid - grid.mean(axis=1, keepdims=True)
+    if np.abs(grid).max() < 1e-3:
+        return None
+    return np.packbits(grid > 0).tobytes().hex()
+
+
+class DuplicateIndex:
+    """
+    All fingerprints in a (recordings x 32) uint8 matrix, plus LSH buckets.
+
+    Each fingerprint is split into 16 bands of 16 bits, and every band value
+    maps to the rows holding it. A lookup only compares against rows sharing
+    at least one band, so the work per insert grows with the number of
+    similar recordings rather than the size of the corpus. Candidates are
+    compared in one vectorized XOR/popcount over their rows.
+    """
+
+    def __init__(self, initial_rows: int = 1024):
+        self._lock = threading.Lock()
+        self._reset(initial_rows)
+
+    def _reset(self, initial_rows: int = 1024):
+        self._recording_ids: List[int] = []
+        self._usernames: List[str] = []
+        self._rows: Dict[int, int] = {}
+        self._bits = np.zeros((initial_rows, FINGERPRINT_BYTES), dtype=np.uint8)
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(NUM_BANDS)]
+
+    @staticmethod
+    def _decode(fingerprint: str) -> Optional[np.ndarray]:
+        try:
+            bits = np.frombuffer(bytes.fromhex(fingerprint), dtype=np.uint8)
+        except (TypeError, ValueError):
+            return None
+        return bits if len(bits) == FINGERPRINT_BYTES else None
+
+    @staticmethod
+    def _bands(bits: np.ndarray) -> List[int]:
+        return np.packbits(np.unpackbits(bits)[_BAND_ORDER]).view(">u2").tolist()
+
+    def _match(self, bits: np.ndarray, max_distance: int) -> List[Tuple[int, int]]:
+        """(row, distance) for indexed fingerprints within max_distance of bits."""
+        candidates = set()
+        for band, value in enumerate(self._bands(bits)):
+            candidates.update(self._buckets[band].get(value, ()))
+        if not candidates:
+            return []
+        rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        distances = _POPCOUNT[self._bits[rows] ^ bits].sum(axis=1)
+        close = distances <= max_distance
+        return list(zip(rows[close].tolist(), distances[close].tolist()))
+
+    def _insert(self, recording_id: int, username: str, bits: np.ndarray):
+        row = len(self._recording_ids)
+        if row >= self._bits.shape[0]:
+            grown = np.zeros((self._bits.shape[0] * 2, FINGERPRINT_BYTES), dtype=np.uint8)
+            grown[:row] = self._bits[:row]
+            self._bits = grown
+        self._bits[row] = bits
+        self._recording_ids.append(recording_id)
+        self._usernames.append(username)
+        self._rows[recording_id] = row
+        for band, value in enumerate(self._bands(bits)):
+            self._buckets[band].setdefault(value, []).append(row)
+
+    def _describe(self, row: int, distance: int) -> Dict:
+        return {
+            "recording_id": self._recording_ids[row],
+            "username": self._usernames[row],
+            "distance": distance
+        }
+
+    @staticmethod
+    def _max_distance(max_distance: Optional[int]) -> int:
+        if max_distance is None:
+            max_distance = settings.duplicate_max_distance
+        return max(0, min(max_distance, MAX_MATCH_DISTANCE))
+
+    def rebuild(self, db):
+        """
+        Load every stored fingerprint from the recordings table.
+        The new index is built without the lock and swapped in; recordings
+        added meanwhile that the query did not see are carried over.
+        """
+        from database import Recording
+        rows = (
+            db.query(Recording.id, Recording.username, Recording.fingerprint)
+            .filter(Recording.fingerprint.isnot(None))
+            .order_by(Recording.id)
+            .all()
+        )
+        fresh = DuplicateIndex(max(1024, len(rows)))
+        for recording_id, username, fingerprint in rows:
+            bits = fresh._decode(fingerprint)
+            if bits is not None:
+                fresh._insert(recording_id, username, bits)
+        last_loaded = rows[-1][0] if rows else 0
+        with self._lock:
+            for row, recording_id in enumerate(self._recording_ids):
+                if recording_id > last_loaded:
+                    fresh._insert(recording_id, self._usernames[row], self._bits[row])
+            self._recording_ids = fresh._recording_ids
+            self._usernames = fresh._usernames
+            self._rows = fresh._rows
+            self._bits = fresh._bits
+            self._buckets = fresh._buckets
+
+    def add(self, recording_id: int, username: str, fingerprint: str, max_distance: int = None) -> List[Dict]:
+        """
+        Index a new recording and return the earlier recordings it nearly duplicates.
+        Takes the index lock, so call it from a worker thread, not the event loop.
+        """
+        bits = self._decode(fingerprint)
+        if bits is None:
+            return []
+        max_distance = self._max_distance(max_distance)
+        with self._lock:
+            if recording_id in self._rows:
+                return []
+            matches = [self._describe(row, distance) for row, distance in self._match(bits, max_distance)]
+            self._insert(recording_id, username, bits)
+        return matches
+
+    def report(self, max_distance: int = None, scope: str = "all") -> Dict:
+        """
+        All near-duplicate pairs among indexed recordings.
+        scope is "all", "within_user" (same participant) or "cross_user".
+
+        Works on a copy of the fingerprints taken under the lock, so uploads
+        are not held up while the pairs are computed. The copy is re-indexed
+        in order and each fingerprint matched against the ones before it.
+        """
+        max_distance = self._max_distance(max_distance)
+        with self._lock:
+            indexed = len(self._recording_ids)
+            recording_ids = list(self._recording_ids)
+            usernames = list(self._usernames)
+            all_bits = self._bits[:indexed].copy()
+
+        snapshot = DuplicateIndex(max(1, indexed))
+        pairs = []
+        within_user = cross_user = 0
+        for row in range(indexed):
+            for other, distance in snapshot._match(all_bits[row], max_distance):
+                same_user = usernames[row] == usernames[other]
+                if same_user:
+                    within_user += 1
+                else:
+                    cross_user += 1
+                if scope == "all" or (scope == "within_user") == same_user:
+                    pairs.append({
+                        "recording_id": recording_ids[row],
+                        "username": usernames[row],
+                        "duplicate_of": recording_ids[other],
+                        "duplicate_username": usernames[other],
+                        "distance": distance,
+                        "same_user": same_user
+                    })
+            snapshot._insert(recording_ids[row], usernames[row], all_bits[row])
+
+        pairs.sort(key=lambda pair: (pair["distance"], pair["recording_id"]))
+        return {
+            "max_distance": max_distance,
+            "scope": scope,
+            "pairs": pairs,
+            "totals": {
+                "recordings_indexed": indexed,
+                "pairs": within_user + cross_user,
+                "within_user": within_user,
+                "cross_user": cross_user
+            }
+        }
+
+
+# Global duplicate index instance
+duplicate_index = DuplicateIndex()
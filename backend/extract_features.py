@@ -0,0 +1,138 @@
+"""Backfill and export the log-mel feature store.
+
+Computes 80-bin log-mel features for every recording not yet in the store,
+in parallel worker processes, and appends them to feature_store. Recordings
+already stored are skipped, so the job can be interrupted and re-run.
+
+--export writes a self-contained training snapshot: logmel.npy (all frames,
+loadable with np.load(..., mmap_mode="r")), metadata.jsonl with each
+recording's metadata plus its feature_offset/feature_frames, and
+features.json with the feature parameters.
+
+Usage:
+    python extract_features.py                      # backfill all recordings
+    python extract_features.py --workers 8 --username alice
+    python extract_features.py --export /data/exports/features
+"""
+import argparse
+import io
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from database import SessionLocal, Recording, init_db
+from feature_store import feature_store, compute_log_mel, N_MELS, FEATURE_DTYPE
+from storage import get_storage
+
+
+def _extract(job: Tuple[int, str]) -> Tuple[int, Optional[np.ndarray], Optional[str]]:
+    """Worker: read one recording from storage and compute its features."""
+    rec_id, locator = job
+    try:
+        storage = get_storage(locator)
+        audio = io.BytesIO(b"".join(storage.iter_chunks(locator)))
+        return rec_id, compute_log_mel(audio), None
+    except Exception as e:
+        return rec_id, None, str(e) or type(e).__name__
+
+
+def backfill(workers: int = None, username: str = None) -> dict:
+    """Compute features for recordings missing from the store."""
+    counts = {"extracted": 0, "skipped": 0, "failed": 0}
+    init_db()
+    db = SessionLocal()
+    try:
+        query = db.query(Recording.id, Recording.file_path).order_by(Recording.id)
+        if username:
+            query = query.filter(Recording.username == username)
+        rows = query.all()
+    finally:
+        db.close()
+
+    stored = set(feature_store.ids())
+    pending = [(rec_id, file_path) for rec_id, file_path in rows if rec_id not in stored]
+    counts["skipped"] = len(rows) - len(pending)
+
+    # Results come back in submission order; appends stay in this process
+    with ProcessPoolExecutor(max_workers=workers or settings.feature_workers) as pool:
+        for rec_id, features, error in pool.map(_extract, pending, chunksize=8):
+            if error is not None:
+                print(f"Failed to extract features for recording {rec_id}: {error}")
+                counts["failed"] += 1
+            elif feature_store.append(rec_id, features):
+                counts["extracted"] += 1
+            else:
+                counts["skipped"] += 1
+
+    return counts
+
+
+def export(output_dir: Path) -> dict:
+    """Write stored features and their recordings' metadata side by side."""
+    init_db()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stored = set(feature_store.ids())
+
+    db = SessionLocal()
+    try:
+        rows = [rec for rec in db.query(Recording).order_by(Recording.id).all() if rec.id in stored]
+    finally:
+        db.close()
+
+    lengths = [feature_store.get(rec.id).shape[0] for rec in rows]
+    features = np.lib.format.open_memmap(
+        output_dir / "logmel.npy", mode="w+", dtype=FEATURE_DTYPE, shape=(sum(lengths), N_MELS)
+    )
+
+    offset = 0
+    with open(output_dir / "metadata.jsonl", "w", encoding="utf-8") as f:
+        for rec, frames in zip(rows, lengths):
+            features[offset:offset + frames] = feature_store.get(rec.id)
+            f.write(json.dumps({
+                "id": rec.id,
+                "username": rec.username,
+                "language": rec.language,
+                "task_type": rec.task_type,
+                "role": rec.role,
+                "item_id": rec.item_id,
+                "file_path": rec.file_path,
+                "created_at": rec.created_at.isoformat() if rec.created_at else None,
+                "feature_offset": offset,
+                "feature_frames": frames
+            }, ensure_ascii=False) + "\n")
+            offset += frames
+    features.flush()
+    del features
+
+    (output_dir / "features.json").write_text(json.dumps(feature_store.params(), indent=2), encoding="utf-8")
+    return {"recordings": len(rows), "frames": offset, "output_dir": str(output_dir)}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Backfill or export precomputed log-mel features")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: FEATURE_WORKERS)")
+    parser.add_argument("--username", default=None, help="Only extract this user's recordings")
+    parser.add_argument("--export", type=Path, default=None, help="Export features and metadata to this directory")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if args.export:
+        result = export(args.export)
+        print(f"Exported {result['recordings']} recordings ({result['frames']} frames) "
+              f"to {result['output_dir']} in {time.perf_counter() - start:.1f}s")
+        return 0
+
+    counts = backfill(workers=args.workers, username=args.username)
+    print(f"Extracted features for {counts['extracted']} recordings in {time.perf_counter() - start:.1f}s, "
+          f"{counts['skipped']} already stored, {counts['failed']} failed")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
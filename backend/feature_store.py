@@ -0,0 +1,229 @@
+"""Precomputed log-mel features in an append-only, memory-mapped store."""
+import json
+import os
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from config import settings
+from audio_utils import read_wav_samples
+
+# Cross-process file locking: fcntl is Unix-only, msvcrt is Windows-only
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+# Feature parameters; stored in meta.json so readers and later writers agree
+N_MELS = 80
+WINDOW_MS = 25
+HOP_MS = 10
+LOG_FLOOR = 1e-10
+FEATURE_DTYPE = np.float16
+
+# Index records: (recording_id, first frame, frame count)
+INDEX_DTYPE = np.dtype([("recording_id", "<i8"), ("offset", "<i8"), ("frames", "<i8")])
+
+
+@lru_cache(maxsize=8)
+def _mel_filterbank(sample_rate: int, n_fft: int, n_mels: int) -> np.ndarray:
+    """Triangular HTK-style mel filters as an (n_fft // 2 + 1, n_mels) matrix."""
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+
+    edges = mel_to_hz(np.linspace(hz_to_mel(0.0), hz_to_mel(sample_rate / 2), n_mels + 2))
+    fft_freqs = np.linspace(0.0, sample_rate / 2, n_fft // 2 + 1)
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (fft_freqs - lower) / (center - lower)
+    falling = (upper - fft_freqs) / (upper - center)
+    return np.maximum(0.0, np.minimum(rising, falling)).T.astype(np.float32)
+
+
+def compute_log_mel(source: Union[Path, BinaryIO]) -> np.ndarray:
+    """
+    Compute (frames, N_MELS) log-mel features for a 16-bit PCM WAV.
+
+    Frames are 25 ms Hann windows every 10 ms. The STFT is one strided view
+    over the signal, one batched rfft and one matrix product with the mel
+    filterbank, so there is no per-frame Python loop.
+    """
+    samples, sample_rate = read_wav_samples(source)
+    window_length = int(sample_rate * WINDOW_MS / 1000)
+    hop_length = int(sample_rate * HOP_MS / 1000)
+    n_fft = 1 << (window_length - 1).bit_length()
+
+    signal = samples.astype(np.float32) / 32768.0
+    if len(signal) < window_length:
+        signal = np.pad(signal, (0, window_length - len(signal)))
+
+    frames = sliding_window_view(signal, window_length)[::hop_length]
+    spectrum = np.fft.rfft(frames * np.hanning(window_length).astype(np.float32), n=n_fft, axis=1)
+    power = (spectrum.real ** 2 + spectrum.imag ** 2).astype(np.float32)
+    mel = power @ _mel_filterbank(sample_rate, n_fft, N_MELS)
+    return np.log(np.maximum(mel, LOG_FLOOR)).astype(FEATURE_DTYPE)
+
+
+class FeatureStore:
+    """
+    Log-mel features for all recordings, concatenated into one flat file.
+
+    logmel.bin holds float16 rows of N_MELS values; index.bin holds fixed-size
+    (recording_id, offset, frames) records appended after each recording's
+    rows are written, so a crash mid-append leaves only an unindexed tail
+    that the next append overwrites. Readers get zero-copy slices of a
+    np.memmap. Appends take an exclusive file lock, so the server's ingest
+    hook and the extract_features.py backfill can run at the same time.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.data_path = directory / "logmel.bin"
+        self.index_path = directory / "index.bin"
+        self.meta_path = directory / "meta.json"
+        self._lock = threading.Lock()
+        self._index: Dict[int, Tuple[int, int]] = {}
+        self._index_bytes = 0
+        self._end = 0
+        self._mmap: Optional[np.memmap] = None
+
+    @staticmethod
+    def params() -> Dict:
+        return {
+            "n_mels": N_MELS,
+            "window_ms": WINDOW_MS,
+            "hop_ms": HOP_MS,
+            "log_floor": LOG_FLOOR,
+            "dtype": np.dtype(FEATURE_DTYPE).name
+        }
+
+    @contextmanager
+    def _file_lock(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / ".lock", "w") as lock_file:
+            if os.name == "nt":
+                # Lock the first byte; LK_LOCK gives up after ~10 s, so keep retrying
+                while True:
+                    try:
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+                try:
+                    yield
+                finally:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh_index(self):
+        """Read index records appended since the last refresh (by any process)."""
+        if not self.index_path.exists():
+            return
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_bytes)
+            data = f.read()
+        whole = len(data) - len(data) % INDEX_DTYPE.itemsize
+        if not whole:
+            return
+        for rec_id, offset, frames in np.frombuffer(data[:whole], dtype=INDEX_DTYPE).tolist():
+            self._index[rec_id] = (offset, frames)
+            self._end = max(self._end, offset + frames)
+        self._index_bytes += whole
+
+    def _check_meta(self):
+        if self.meta_path.exists():
+            stored = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            if stored != self.params():
+                raise RuntimeError(
+                    f"Feature store at {self.directory} was built with {stored}, "
+                    f"not {self.params()}; move it aside to rebuild"
+                )
+        else:
+            self.meta_path.write_text(json.dumps(self.params(), indent=2), encoding="utf-8")
+
+    def has(self, recording_id: int) -> bool:
+        with self._lock:
+            if recording_id not in self._index:
+                self._refresh_index()
+            return recording_id in self._index
+
+    def ids(self) -> List[int]:
+        with self._lock:
+            self._refresh_index()
+            return sorted(self._index)
+
+    def append(self, recording_id: int, features: np.ndarray) -> bool:
+        """Add one recording's features; returns False if it is already stored."""
+        features = np.ascontiguousarray(features, dtype=FEATURE_DTYPE)
+        if features.ndim != 2 or features.shape[1] != N_MELS:
+            raise ValueError(f"Expected (frames, {N_MELS}) features, got {features.shape}")
+
+        with self._lock, self._file_lock():
+            self._check_meta()
+            self._refresh_index()
+            if recording_id in self._index:
+                return False
+
+            offset = self._end
+            row_bytes = N_MELS * np.dtype(FEATURE_DTYPE).itemsize
+            with open(self.data_path, "r+b" if self.data_path.exists() else "w+b") as f:
+                f.seek(offset * row_bytes)
+                f.write(features.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            record = np.array([(recording_id, offset, len(features))], dtype=INDEX_DTYPE)
+            with open(self.index_path, "ab") as f:
+                f.write(record.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._index[recording_id] = (offset, len(features))
+            self._index_bytes += INDEX_DTYPE.itemsize
+            self._end = offset + len(features)
+            return True
+
+    def get(self, recording_id: int) -> Optional[np.ndarray]:
+        """Return a read-only (frames, N_MELS) view of one recording's features."""
+        with self._lock:
+            if recording_id not in self._index:
+                self._refresh_index()
+            entry = self._index.get(recording_id)
+            if entry is None:
+                return None
+            offset, frames = entry
+            if self._mmap is None or self._mmap.shape[0] < offset + frames:
+                self._mmap = np.memmap(self.data_path, dtype=FEATURE_DTYPE, mode="r", shape=(self._end, N_MELS))
+            return self._mmap[offset:offset + frames]
+
+    def iter_features(self, recording_ids: List[int]) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (recording_id, features) for the given ids that are stored."""
+        for rec_id in recording_ids:
+            features = self.get(rec_id)
+            if features is not None:
+                yield rec_id, features
+
+    def status(self) -> Dict:
+        with self._lock:
+            self._refresh_index()
+            return {
+                "directory": str(self.directory),
+                "recordings": len(self._index),
+                "frames": self._end,
+                "params": self.params()
+            }
+
+
+# Global feature store instance
+feature_store = FeatureStore(settings.feature_store_dir)
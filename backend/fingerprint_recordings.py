@@ -0,0 +1,111 @@
+"""Backfill duplicate-detection fingerprints for existing recordings.
+
+New recordings are fingerprinted as they are saved; this fills in
+Recording.fingerprint for rows saved before that, in parallel worker
+processes. Features already in the feature store are reused instead of
+decoding the WAV again. Rows that already have a fingerprint are skipped.
+
+The running server loads fingerprints at startup; afterwards, call
+GET /api/admin/duplicates?rebuild=true to pick up the backfilled ones.
+
+Usage:
+    python fingerprint_recordings.py
+    python fingerprint_recordings.py --workers 8 --username alice
+"""
+import argparse
+import io
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from config import settings
+from database import SessionLocal, Recording, init_db
+from duplicate_index import fingerprint_from_features
+from feature_store import feature_store, compute_log_mel
+from storage import get_storage
+
+
+def _fingerprint(job: Tuple[int, str]) -> Tuple[int, Optional[str], Optional[str]]:
+    """Worker: fingerprint one recording from stored features or its audio."""
+    rec_id, locator = job
+    try:
+        features = feature_store.get(rec_id)
+        if features is None:
+            storage = get_storage(locator)
+            features = compute_log_mel(io.BytesIO(b"".join(storage.iter_chunks(locator))))
+        return rec_id, fingerprint_from_features(features), None
+    except Exception as e:
+        return rec_id, None, str(e) or type(e).__name__
+
+
+def _write_fingerprints(db, results: List[Tuple[int, str]]):
+    """
+    Store computed fingerprints in one short transaction. The updates are
+    only issued once a chunk is complete, so SQLite's write lock is never
+    held while waiting on workers and live uploads are not blocked.
+    """
+    if not results:
+        return
+    for rec_id, fingerprint in results:
+        db.query(Recording).filter(Recording.id == rec_id).update({Recording.fingerprint: fingerprint})
+    db.commit()
+
+
+def backfill(workers: int = None, username: str = None, commit_every: int = 500) -> dict:
+    """Compute fingerprints for recordings that do not have one."""
+    counts = {"fingerprinted": 0, "unusable": 0, "failed": 0}
+    init_db()
+    db = SessionLocal()
+    try:
+        query = (
+            db.query(Recording.id, Recording.file_path)
+            .filter(Recording.fingerprint.is_(None))
+            .order_by(Recording.id)
+        )
+        if username:
+            query = query.filter(Recording.username == username)
+        pending = [(rec_id, file_path) for rec_id, file_path in query.all()]
+
+        # End the read transaction so the pool runs without holding any database lock
+        db.commit()
+
+        results: List[Tuple[int, str]] = []
+        with ProcessPoolExecutor(max_workers=workers or settings.feature_workers) as pool:
+            for rec_id, fingerprint, error in pool.map(_fingerprint, pending, chunksize=8):
+                if error is not None:
+                    print(f"Failed to fingerprint recording {rec_id}: {error}")
+                    counts["failed"] += 1
+                    continue
+                if fingerprint is None:
+                    # Too short or silent to fingerprint
+                    counts["unusable"] += 1
+                    continue
+                results.append((rec_id, fingerprint))
+                if len(results) >= commit_every:
+                    _write_fingerprints(db, results)
+                    counts["fingerprinted"] += len(results)
+                    results = []
+        _write_fingerprints(db, results)
+        counts["fingerprinted"] += len(results)
+    finally:
+        db.close()
+
+    return counts
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Backfill recording fingerprints for duplicate detection")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: FEATURE_WORKERS)")
+    parser.add_argument("--username", default=None, help="Only fingerprint this user's recordings")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    counts = backfill(workers=args.workers, username=args.username)
+    print(f"Fingerprinted {counts['fingerprinted']} recordings in {time.perf_counter() - start:.1f}s, "
+          f"{counts['unusable']} too short or silent, {counts['failed']} failed")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+"""Tracking of in-flight uploads by idempotency key."""
+import asyncio
+from typing import Dict, Optional, Tuple
+
+# (username, idempotency key): keys are only unique per user
+UploadKey = Tuple[str, str]
+
+
+class InFlightUploads:
+    """
+    Maps (username, idempotency key) to the upload currently processing it,
+    along with the recording parameters it was started with.
+    
+    Completed uploads are found through Recording.idempotency_key in the
+    database; this registry only covers the window while the first request
+    is still converting, so repeats can wait for its result instead of
+    starting a second conversion. Used only from the event loop thread.
+    """
+    
+    def __init__(self):
+        self._pending: Dict[UploadKey, Tuple[asyncio.Future, tuple]] = {}
+    
+    def get(self, key: UploadKey) -> Optional[Tuple[asyncio.Future, tuple]]:
+        """Return (future, params) for an upload in progress with this key, if any."""
+        return self._pending.get(key)
+    
+    def start(self, key: UploadKey, params: tuple) -> asyncio.Future:
+        """Register a new in-flight upload for this key."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = (future, params)
+        return future
+    
+    def finish(self, key: UploadKey, result: Optional[dict] = None, error: Optional[BaseException] = None):
+        """Resolve waiters with the upload's response or error and forget the key."""
+        future, _ = self._pending.pop(key, (None, None))
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+            # Mark as retrieved so an error nobody waited for is not logged
+            future.exception()
+        else:
+            future.set_result(result)
+    
+    async def wait(self, future: asyncio.Future) -> dict:
+        """Wait for another request's upload; a cancelled waiter does not cancel it."""
+        return await asyncio.shield(future)
+
+
+# Global in-flight upload registry
+inflight_uploads = InFlightUploads()
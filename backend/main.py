@@ -1,18 +1,36 @@
 """Main FastAPI application."""
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form, Header, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, PlainTextResponse, StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Optional, Tuple
+import asyncio
+import io
+import json
+import re
 import tempfile
+import time
 from pathlib import Path
 
 from config import settings
-from database import init_db, get_db, User, Recording, get_user_progress
+from database import init_db, get_db, SessionLocal, User, Recording, get_user_progress, start_query_stats
 from data_loader import data_loader
 from instruction_loader import instruction_loader
 from task_manager import task_manager
-from audio_utils import generate_filename, convert_to_wav, check_ffmpeg_installed
+from audio_utils import (
+    UPLOAD_TEMP_PREFIX, generate_filename, get_recording_path, convert_to_wav, check_ffmpeg_installed,
+    compute_waveform_peaks, StreamingWavConverter, batch_converter
+)
+from profiler import request_profiler
+from admission import conversion_admission, AdmissionRejected
+from idempotency import inflight_uploads
+from storage import recording_storage, get_storage, recording_key, S3Storage, PEAKS_SUFFIX
+from corpus_coverage import corpus_coverage
+from feature_store import feature_store, compute_log_mel
+from duplicate_index import duplicate_index, fingerprint_from_features, MAX_MATCH_DISTANCE
+from backup import database_backup, run_backup_schedule
 
 
 # Initialize FastAPI app
@@ -29,9 +47,59 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "X-Profile-Id", "X-DB-Query-Count", "X-DB-Time-Ms", "Accept-Ranges", "Content-Range", "Content-Length"],
 )
 
 
+@app.middleware("http")
+async def track_queries(request: Request, call_next):
+    """Attach the number of SQL queries and total DB time for this request to the response."""
+    stats = start_query_stats()
+    response = await call_next(request)
+    response.headers["X-DB-Query-Count"] = str(stats.count)
+    response.headers["X-DB-Time-Ms"] = f"{stats.total_ms:.3f}"
+    if settings.log_query_stats:
+        print(f"{request.method} {request.url.path}: {stats.count} queries, {stats.total_ms:.1f} ms in DB")
+    return response
+
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """Profile sampled requests, or requests carrying the debug header, when enabled."""
+    if not request_profiler.enabled:
+        return await call_next(request)
+    
+    # Every request is counted, so a capture can report what overlapped it
+    request_profiler.request_started()
+    try:
+        if not request_profiler.should_profile(request.headers):
+            return await call_next(request)
+        
+        profile = request_profiler.start()
+        if profile is None:
+            # Another request is already being profiled
+            return await call_next(request)
+        
+        started = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+        finally:
+            profile_id = request_profiler.finish(
+                profile,
+                request.headers.get("X-Request-ID"),
+                request.method,
+                request.url.path,
+                status_code,
+                started
+            )
+        response.headers["X-Profile-Id"] = profile_id
+        return response
+    finally:
+        request_profiler.request_finished()
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize database and check dependencies on startup."""
@@ -50,6 +118,25 @@ async def startup_event():
     if not check_ffmpeg_installed():
         print("WARNING: ffmpeg is not installed! Audio conversion will fail.")
         print("Please install ffmpeg: https://ffmpeg.org/download.html")
+    
+    db = SessionLocal()
+    try:
+        corpus_coverage.rebuild(db)
+        duplicate_index.rebuild(db)
+    finally:
+        db.close()
+    print("Corpus coverage counts built")
+    print("Duplicate fingerprint index built")
+    
+    print(f"Recording storage backend: {settings.storage_backend}")
+    if isinstance(recording_storage, S3Storage) and settings.storage_s3_create_bucket:
+        recording_storage.ensure_bucket()
+    
+    if settings.backup_interval_hours > 0:
+        app.state.backup_task = asyncio.create_task(
+            run_backup_schedule(database_backup, settings.backup_interval_hours)
+        )
+        print(f"Database backups scheduled every {settings.backup_interval_hours}h to {settings.backup_dir}")
 
 
 @app.get("/")
@@ -58,7 +145,8 @@ async def root():
     return {
         "status": "ok",
         "message": "VoxPrivacyRecord API is running",
-        "ffmpeg_available": check_ffmpeg_installed()
+        "ffmpeg_available": check_ffmpeg_installed(),
+        "conversion": conversion_admission.status()
     }
 
 
@@ -139,20 +227,8 @@ async def get_next_task(
     }
 
 
-@app.post("/api/upload_recording")
-async def upload_recording(
-    username: str = Form(...),
-    language: str = Form(...),
-    task_type: str = Form(...),
-    role: str = Form(...),
-    item_id: str = Form(...),
-    audio: UploadFile = File(...),
-    db: Session = Depends(get_db)
-):
-    """
-    Upload and process an audio recording.
-    Converts audio to WAV format and stores metadata.
-    """
+def _validate_recording_params(db: Session, username: str, language: str, task_type: str, role: str, item_id: str):
+    """Validate recording metadata, raising HTTPException on bad input."""
     # Validate user exists
     user = db.query(User).filter(User.username == username).first()
     if not user:
@@ -172,52 +248,209 @@ async def upload_recording(
             data_loader.get_item_by_id(language, item_id)
         except ValueError:
             raise HTTPException(status_code=400, detail=f"Item {item_id} not found in {language} data")
+
+
+def _check_idempotent_repeat(recording: Recording, language: str, task_type: str, role: str, item_id: str):
+    """Reject an idempotency key reused for a different recording of the same user."""
+    if (recording.language, recording.task_type, recording.role, recording.item_id) != (language, task_type, role, item_id):
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency key was already used for a different recording"
+        )
+
+
+def _upload_response(db: Session, recording: Recording, message: str) -> dict:
+    """Build the upload response for a stored recording."""
+    progress = get_user_progress(db, recording.username)
+    clean_progress = {k: v for k, v in progress.items() if not k.startswith("_")}
     
+    return {
+        "status": "ok",
+        "file_path": recording.file_path,
+        "filename": Path(recording.file_path).name,
+        "progress": clean_progress,
+        "message": message
+    }
+
+
+@app.post("/api/upload_recording")
+async def upload_recording(
+    username: str = Form(...),
+    language: str = Form(...),
+    task_type: str = Form(...),
+    role: str = Form(...),
+    item_id: str = Form(...),
+    audio: UploadFile = File(...),
+    idempotency_key: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload and process an audio recording.
+    Converts audio to WAV format and stores metadata.
+    
+    An optional Idempotency-Key header (one per take) collapses client retries:
+    a repeat while the first request is converting waits for its result, and a
+    repeat after it finished gets the stored recording back without re-converting.
+    """
+    _validate_recording_params(db, username, language, task_type, role, item_id)
+    
+    if not idempotency_key:
+        return await _store_upload(db, username, language, task_type, role, item_id, audio, None)
+    
+    # Repeat of an upload that already finished
+    existing = db.query(Recording).filter(
+        Recording.username == username,
+        Recording.idempotency_key == idempotency_key
+    ).first()
+    if existing:
+        _check_idempotent_repeat(existing, language, task_type, role, item_id)
+        return _upload_response(db, existing, "Recording already uploaded")
+    
+    # Repeat of an upload that is still converting
+    key = (username, idempotency_key)
+    params = (language, task_type, role, item_id)
+    pending = inflight_uploads.get(key)
+    if pending is not None:
+        future, pending_params = pending
+        if pending_params != params:
+            raise HTTPException(status_code=422, detail="Idempotency key was already used for a different recording")
+        return await inflight_uploads.wait(future)
+    
+    inflight_uploads.start(key, params)
+    try:
+        result = await _store_upload(db, username, language, task_type, role, item_id, audio, idempotency_key)
+    except BaseException as e:
+        inflight_uploads.finish(key, error=e)
+        raise
+    inflight_uploads.finish(key, result=result)
+    return result
+
+
+async def _save_recording(
+    db: Session,
+    username: str,
+    language: str,
+    task_type: str,
+    role: str,
+    item_id: str,
+    output_path: Path,
+    idempotency_key: Optional[str]
+) -> dict:
+    """Move a converted recording into storage, save its metadata and return the upload response."""
+    # Peaks are computed from the local file so remote backends never need to read it back
+    try:
+        peaks = await run_in_threadpool(compute_waveform_peaks, output_path)
+    except Exception as e:
+        print(f"Warning: could not compute waveform peaks for {output_path.name}: {e}")
+        peaks = None
+    
+    # Log-mel features feed the duplicate fingerprint and, if enabled, the feature store
+    try:
+        features = await run_in_threadpool(compute_log_mel, output_path)
+        fingerprint = fingerprint_from_features(features)
+    except Exception as e:
+        print(f"Warning: could not compute features for {output_path.name}: {e}")
+        features = fingerprint = None
+    
+    locator = await run_in_threadpool(recording_storage.store, output_path, recording_key(output_path))
+    if peaks is not None:
+        await run_in_threadpool(
+            recording_storage.write_sidecar, locator, PEAKS_SUFFIX, json.dumps(peaks).encode("utf-8")
+        )
+    
+    # Save metadata to database
+    recording = Recording(
+        username=username,
+        language=language,
+        task_type=task_type,
+        role=role,
+        item_id=item_id,
+        file_path=locator,
+        idempotency_key=idempotency_key,
+        fingerprint=fingerprint
+    )
+    db.add(recording)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another worker stored the same idempotency key first; keep its copy
+        db.rollback()
+        await run_in_threadpool(recording_storage.delete, locator)
+        existing = db.query(Recording).filter(
+            Recording.username == username,
+            Recording.idempotency_key == idempotency_key
+        ).first()
+        if existing is None:
+            raise
+        _check_idempotent_repeat(existing, language, task_type, role, item_id)
+        return _upload_response(db, existing, "Recording already uploaded")
+    except Exception:
+        await run_in_threadpool(recording_storage.delete, locator)
+        raise
+    
+    corpus_coverage.record(username, language, task_type, role, item_id)
+    duplicates = await run_in_threadpool(duplicate_index.add, recording.id, username, fingerprint) if fingerprint else []
+    if duplicates:
+        print(f"Possible duplicate: recording {recording.id} ({username}, {item_id}) matches "
+              + ", ".join(f"{d['recording_id']} ({d['username']}, {d['distance']} bits)" for d in duplicates))
+    if features is not None and settings.feature_extract_on_ingest:
+        try:
+            await run_in_threadpool(feature_store.append, recording.id, features)
+        except Exception as e:
+            print(f"Warning: could not store features for recording {recording.id}: {e}")
+    print(f"Saved recording: {output_path.name}")
+    
+    response = _upload_response(db, recording, "Recording uploaded successfully")
+    if settings.duplicate_flag_on_upload:
+        response["possible_duplicate"] = bool(duplicates)
+    return response
+
+
+async def _store_upload(
+    db: Session,
+    username: str,
+    language: str,
+    task_type: str,
+    role: str,
+    item_id: str,
+    audio: UploadFile,
+    idempotency_key: Optional[str]
+) -> dict:
+    """Convert an uploaded recording to WAV and save its metadata."""
     # Generate filename
     filename = generate_filename(username, language, task_type, role, item_id)
-    output_path = settings.recordings_dir / filename
+    output_path = get_recording_path(username, filename)
     
+    temp_path = None
     try:
         # Save uploaded file to temporary location
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as temp_file:
+        with tempfile.NamedTemporaryFile(delete=False, prefix=UPLOAD_TEMP_PREFIX, suffix=".webm") as temp_file:
             temp_path = Path(temp_file.name)
             content = await audio.read()
             temp_file.write(content)
         
-        # Convert to WAV
-        success, message = convert_to_wav(temp_path, output_path)
-        
-        # Clean up temp file
-        temp_path.unlink()
+        # Convert to WAV off the event loop, limited by admission control
+        # (batched conversions take one slot per ffmpeg run, inside the batch converter)
+        try:
+            if settings.conversion_batch_window_ms > 0:
+                success, message = await batch_converter.convert(temp_path, output_path)
+            else:
+                async with conversion_admission.admit():
+                    success, message = await run_in_threadpool(convert_to_wav, temp_path, output_path)
+        except AdmissionRejected as e:
+            raise HTTPException(
+                status_code=429,
+                detail="Server is busy processing other recordings. Please retry shortly.",
+                headers={"Retry-After": str(e.retry_after)}
+            )
         
         if not success:
+            # Don't leave a partial WAV behind
+            if output_path.exists():
+                output_path.unlink()
             raise HTTPException(status_code=500, detail=f"Audio conversion failed: {message}")
         
-        # Save metadata to database
-        recording = Recording(
-            username=username,
-            language=language,
-            task_type=task_type,
-            role=role,
-            item_id=item_id,
-            file_path=str(output_path)
-        )
-        db.add(recording)
-        db.commit()
-        
-        print(f"Saved recording: {filename}")
-        
-        # Get updated progress
-        progress = get_user_progress(db, username)
-        clean_progress = {k: v for k, v in progress.items() if not k.startswith("_")}
-        
-        return {
-            "status": "ok",
-            "file_path": str(output_path),
-            "filename": filename,
-            "progress": clean_progress,
-            "message": "Recording uploaded successfully"
-        }
+        return await _save_recording(db, username, language, task_type, role, item_id, output_path, idempotency_key)
     
     except HTTPException:
         raise
@@ -226,6 +459,139 @@ async def upload_recording(
         if output_path.exists():
             output_path.unlink()
         raise HTTPException(status_code=500, detail=f"Error processing upload: {str(e)}")
+    finally:
+        # Clean up temp file, whatever happened
+        if temp_path is not None and temp_path.exists():
+            temp_path.unlink()
+
+
+# Number of live streaming sessions (each holds one ffmpeg process)
+_active_streams = 0
+
+
+@app.websocket("/api/stream_recording")
+async def stream_recording(
+    websocket: WebSocket,
+    username: str,
+    language: str,
+    task_type: str,
+    role: str,
+    item_id: str,
+    take_id: Optional[str] = None
+):
+    """
+    Stream a recording while it is being made.
+    
+    The client sends MediaRecorder chunks as binary messages; they are piped
+    into ffmpeg as they arrive. Text messages control the session:
+    - {"type": "end"}: recording stopped; finish the WAV and reply {"type": "ready"}
+    - {"type": "commit"}: store the recording and reply {"type": "committed", ...upload response}
+    - {"type": "cancel"}: discard the take
+    Errors are sent as {"type": "error", "status": ..., "detail": ...} before closing.
+    take_id is used as the idempotency key, shared with /api/upload_recording.
+    """
+    global _active_streams
+    await websocket.accept()
+    
+    async def send_error(status_code: int, detail: str, close_code: int = 1011):
+        await websocket.send_json({"type": "error", "status": status_code, "detail": detail})
+        await websocket.close(code=close_code)
+    
+    # A session lasts as long as the take (and its review), so database sessions
+    # are opened only around the queries instead of being held for the whole take
+    db = SessionLocal()
+    try:
+        _validate_recording_params(db, username, language, task_type, role, item_id)
+        existing = None
+        if take_id:
+            existing = db.query(Recording).filter(
+                Recording.username == username,
+                Recording.idempotency_key == take_id
+            ).first()
+            if existing:
+                _check_idempotent_repeat(existing, language, task_type, role, item_id)
+                repeat_response = _upload_response(db, existing, "Recording already uploaded")
+    except HTTPException as e:
+        await send_error(e.status_code, e.detail, close_code=1008)
+        return
+    finally:
+        db.close()
+    
+    if existing:
+        await websocket.send_json({"type": "committed", **repeat_response})
+        await websocket.close()
+        return
+    
+    if _active_streams >= settings.stream_max_sessions:
+        await send_error(429, "Server is busy processing other recordings. Please retry shortly.", close_code=1013)
+        return
+    
+    # Count the session before awaiting, so concurrent connects cannot pass the cap
+    _active_streams += 1
+    filename = generate_filename(username, language, task_type, role, item_id)
+    converter = StreamingWavConverter(get_recording_path(username, filename))
+    success, message = await converter.start()
+    if not success:
+        _active_streams -= 1
+        await send_error(500, f"Audio conversion failed: {message}")
+        return
+    
+    committed = False
+    try:
+        while True:
+            event = await websocket.receive()
+            if event["type"] == "websocket.disconnect":
+                break
+            
+            if event.get("bytes") is not None:
+                if not await converter.write(event["bytes"]):
+                    success, message = await converter.finish()
+                    await send_error(500, f"Audio conversion failed: {message}")
+                    break
+                continue
+            
+            try:
+                command = json.loads(event.get("text") or "{}").get("type")
+            except (json.JSONDecodeError, AttributeError):
+                command = None
+            
+            if command in ("end", "commit"):
+                success, message = await converter.finish()
+                if not success:
+                    await send_error(500, f"Audio conversion failed: {message}")
+                    break
+                if command == "end":
+                    await websocket.send_json({"type": "ready"})
+                    continue
+                
+                db = SessionLocal()
+                try:
+                    result = await _save_recording(db, username, language, task_type, role, item_id,
+                                                   converter.output_path, take_id)
+                except HTTPException as e:
+                    await send_error(e.status_code, e.detail)
+                    break
+                except Exception as e:
+                    await send_error(500, f"Error processing upload: {str(e)}")
+                    break
+                finally:
+                    db.close()
+                committed = True
+                await websocket.send_json({"type": "committed", **result})
+                await websocket.close()
+                break
+            elif command == "cancel":
+                await websocket.close()
+                break
+            else:
+                await send_error(400, f"Unknown command: {command}", close_code=1008)
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        _active_streams -= 1
+        if not committed:
+            await converter.abort()
 
 
 @app.get("/api/admin/export_metadata")
@@ -276,10 +642,64 @@ async def get_user_stats(db: Session = Depends(get_db)):
     }
 
 
+@app.get("/api/admin/coverage")
+async def get_coverage(language: Optional[str] = None):
+    """
+    Corpus coverage per item: complete pairs, lone secrets, lone questions and
+    extra questions, plus per-line totals for the instruction files.
+    Served from in-memory counts; the recordings table is not scanned.
+    """
+    if language is not None and language not in ["zh", "en"]:
+        raise HTTPException(status_code=400, detail="Language must be 'zh' or 'en'")
+    
+    languages = [language] if language else ["zh", "en"]
+    return {lang: corpus_coverage.report(lang) for lang in languages}
+
+
+@app.get("/api/admin/duplicates")
+async def get_duplicates(
+    scope: str = "all",
+    max_distance: Optional[int] = None,
+    rebuild: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Near-duplicate recording pairs by spectral fingerprint.
+    scope: "all", "within_user" or "cross_user". rebuild=true reloads
+    fingerprints from the database first (e.g. after fingerprint_recordings.py).
+    """
+    if scope not in ["all", "within_user", "cross_user"]:
+        raise HTTPException(status_code=400, detail="Invalid scope")
+    if max_distance is not None and not 0 <= max_distance <= MAX_MATCH_DISTANCE:
+        # Beyond this the LSH bands miss most pairs, so results would be misleading
+        raise HTTPException(status_code=400, detail=f"max_distance must be between 0 and {MAX_MATCH_DISTANCE}")
+    
+    if rebuild:
+        await run_in_threadpool(duplicate_index.rebuild, db)
+    report = await run_in_threadpool(duplicate_index.report, max_distance, scope)
+    
+    # Attach item metadata for the recordings involved
+    ids = {pair["recording_id"] for pair in report["pairs"]} | {pair["duplicate_of"] for pair in report["pairs"]}
+    items = {}
+    id_list = list(ids)
+    for start in range(0, len(id_list), 500):
+        rows = db.query(Recording.id, Recording.language, Recording.task_type, Recording.item_id).filter(
+            Recording.id.in_(id_list[start:start + 500])
+        ).all()
+        items.update({row.id: f"{row.language}/{row.task_type}/{row.item_id}" for row in rows})
+    for pair in report["pairs"]:
+        pair["item"] = items.get(pair["recording_id"])
+        pair["duplicate_item"] = items.get(pair["duplicate_of"])
+    
+    return report
+
+
 @app.get("/api/admin/download_recordings")
-async def download_all_recordings():
+def download_all_recordings(db: Session = Depends(get_db)):
     """
     Download all recordings as a zip file.
+    The recordings table is the index of stored files; the directory is never listed.
+    A plain def so FastAPI runs it in the threadpool: reading from S3 blocks.
     """
     import zipfile
     import tempfile
@@ -287,14 +707,8 @@ async def download_all_recordings():
     import os
     from datetime import datetime
     
-    recordings_path = settings.recordings_dir
-    
-    # Check if directory exists and has files
-    if not recordings_path.exists():
-        raise HTTPException(status_code=404, detail="Recordings directory not found")
-    
-    wav_files = list(recordings_path.glob('*.wav'))
-    if not wav_files:
+    locators = [row.file_path for row in db.query(Recording.file_path).all()]
+    if not locators:
         raise HTTPException(status_code=404, detail="No recordings found")
     
     # Create zip file in data directory (persistent)
@@ -302,17 +716,180 @@ async def download_all_recordings():
     zip_filename = f'recordings_{timestamp}.zip'
     zip_path = settings.data_dir / zip_filename
     
-    # Create the zip file
+    # Create the zip file, streaming each recording from the backend that holds it
+    file_count = 0
     with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for audio_file in wav_files:
+        for locator in locators:
+            storage = get_storage(locator)
+            if not storage.exists(locator):
+                continue
             # Add file to zip with just the filename (not full path)
-            zipf.write(audio_file, audio_file.name)
+            with zipf.open(Path(locator).name, 'w') as dest:
+                for chunk in storage.iter_chunks(locator):
+                    dest.write(chunk)
+            file_count += 1
+    
+    if file_count == 0:
+        zip_path.unlink()
+        raise HTTPException(status_code=404, detail="No recordings found")
     
     # Return the zip file
     return FileResponse(
         path=str(zip_path),
         media_type='application/zip',
-        filename=f'voxprivacy_recordings_{len(wav_files)}_files.zip'
+        filename=f'voxprivacy_recordings_{file_count}_files.zip'
+    )
+
+
+def _parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range "bytes=" header into inclusive (start, end) offsets.
+    Returns None for headers that are ignored and answered with the full file,
+    as RFC 9110 allows: other units, multiple ranges and malformed specs.
+    Raises 416 for a valid range that starts beyond the end of the file.
+    """
+    unit, _, spec = range_header.partition("=")
+    match = re.fullmatch(r"(\d*)-(\d*)", spec.strip())
+    if unit.strip().lower() != "bytes" or match is None or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    else:
+        # Suffix range: the final N bytes
+        start = max(0, size - int(last))
+        end = size - 1
+    if start >= size or end < start:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+
+def _get_recording_or_404(db: Session, recording_id: int) -> Recording:
+    recording = db.query(Recording).filter(Recording.id == recording_id).first()
+    if not recording:
+        raise HTTPException(status_code=404, detail=f"Recording {recording_id} not found")
+    return recording
+
+
+@app.get("/api/admin/recordings/{recording_id}/audio")
+async def download_recording(
+    recording_id: int,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    db: Session = Depends(get_db)
+):
+    """
+    Stream a single recording from whichever storage backend holds it.
+    Supports single byte ranges so audio players can seek without downloading the whole file.
+    """
+    recording = _get_recording_or_404(db, recording_id)
+    
+    storage = get_storage(recording.file_path)
+    if not await run_in_threadpool(storage.exists, recording.file_path):
+        raise HTTPException(status_code=404, detail=f"File for recording {recording_id} is missing")
+    
+    size = await run_in_threadpool(storage.size, recording.file_path)
+    filename = Path(recording.file_path).name
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'inline; filename="{filename}"'
+    }
+    
+    byte_range = _parse_range(range_header, size) if range_header else None
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(storage.iter_chunks(recording.file_path), media_type="audio/wav", headers=headers)
+    
+    start, end = byte_range
+    headers["Content-Length"] = str(end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        storage.iter_chunks(recording.file_path, start, end),
+        status_code=206,
+        media_type="audio/wav",
+        headers=headers
+    )
+
+
+@app.get("/api/admin/recordings/{recording_id}/peaks")
+async def get_recording_peaks(recording_id: int, db: Session = Depends(get_db)):
+    """
+    Waveform peak summary for a recording, read from its cached sidecar.
+    Recordings saved before peaks existed are summarized on first request and cached.
+    """
+    recording = _get_recording_or_404(db, recording_id)
+    storage = get_storage(recording.file_path)
+    
+    cached = await run_in_threadpool(storage.read_sidecar, recording.file_path, PEAKS_SUFFIX)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    
+    if not await run_in_threadpool(storage.exists, recording.file_path):
+        raise HTTPException(status_code=404, detail=f"File for recording {recording_id} is missing")
+    
+    try:
+        audio = io.BytesIO(b"".join(await run_in_threadpool(list, storage.iter_chunks(recording.file_path))))
+        peaks = await run_in_threadpool(compute_waveform_peaks, audio)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Could not read recording {recording_id}: {e}")
+    
+    content = json.dumps(peaks).encode("utf-8")
+    await run_in_threadpool(storage.write_sidecar, recording.file_path, PEAKS_SUFFIX, content)
+    return Response(content=content, media_type="application/json")
+
+
+@app.post("/api/admin/backup")
+async def trigger_backup():
+    """Start an online database backup in the background."""
+    if not database_backup.start():
+        raise HTTPException(status_code=409, detail="A backup is already running")
+    return database_backup.status()
+
+
+@app.get("/api/admin/backup")
+async def get_backup_status():
+    """Status of the current or last backup, and the snapshots kept."""
+    return database_backup.status()
+
+
+@app.get("/api/admin/profiles")
+async def list_profiles():
+    """List captured request profiles, newest first."""
+    profiles = request_profiler.list_profiles()
+    return {
+        "enabled": request_profiler.enabled,
+        "sample_rate": request_profiler.sample_rate,
+        "header": request_profiler.header_name,
+        "total_profiles": len(profiles),
+        "profiles": profiles
+    }
+
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def download_profile(profile_id: str, format: str = "prof"):
+    """
+    Download a captured profile.
+    format=prof returns a binary file for pstats/snakeviz, format=text a pstats report.
+    """
+    profile = request_profiler.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    
+    if format == "text":
+        return PlainTextResponse(profile.to_text())
+    if format != "prof":
+        raise HTTPException(status_code=400, detail="Format must be 'prof' or 'text'")
+    
+    return Response(
+        content=profile.to_prof_bytes(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile_{profile_id}.prof"'}
     )
 
 
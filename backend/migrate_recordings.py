@@ -0,0 +1,104 @@
+"""Move existing recordings into the sharded directory layout.
+
+Walks the recordings table (the authoritative file index), moves each file
+to the path returned by get_recording_path() along with its sidecar files,
+and updates Recording.file_path.
+Safe to re-run: rows already in place are skipped.
+
+Usage:
+    python migrate_recordings.py            # migrate
+    python migrate_recordings.py --dry-run  # report only
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import List
+
+from database import SessionLocal, Recording, init_db
+from audio_utils import get_recording_path
+from storage import SIDECAR_SUFFIXES, local_storage
+
+
+def _move_sidecars(current_path: Path, target_path: Path):
+    """Move a recording's sidecar files (e.g. cached peaks) next to its new path."""
+    for suffix in SIDECAR_SUFFIXES:
+        sidecar = Path(str(current_path) + suffix)
+        if sidecar.exists():
+            os.replace(sidecar, Path(str(target_path) + suffix))
+
+
+def migrate(dry_run: bool = False, batch_size: int = 500) -> dict:
+    """Move recordings into the sharded layout and return counts of what happened."""
+    counts = {"moved": 0, "already_sharded": 0, "missing": 0, "remote": 0}
+    init_db()
+    db = SessionLocal()
+    try:
+        last_id = 0
+        while True:
+            rows = (
+                db.query(Recording)
+                .filter(Recording.id > last_id)
+                .order_by(Recording.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+            
+            for rec in rows:
+                last_id = rec.id
+                if not local_storage.handles(rec.file_path):
+                    # Already in object storage; sharding applies to the local disk only
+                    counts["remote"] += 1
+                    continue
+                current_path = Path(rec.file_path)
+                target_path = get_recording_path(rec.username, current_path.name, create=not dry_run)
+                
+                if current_path == target_path:
+                    counts["already_sharded"] += 1
+                    continue
+                
+                if not current_path.exists():
+                    if target_path.exists():
+                        # File was moved by an interrupted earlier run; just fix the row
+                        if not dry_run:
+                            _move_sidecars(current_path, target_path)
+                            rec.file_path = str(target_path)
+                        counts["moved"] += 1
+                    else:
+                        print(f"Missing file for recording {rec.id}: {current_path}")
+                        counts["missing"] += 1
+                    continue
+                
+                if not dry_run:
+                    os.replace(current_path, target_path)
+                    _move_sidecars(current_path, target_path)
+                    rec.file_path = str(target_path)
+                counts["moved"] += 1
+            
+            # Commit per batch so an interruption loses little progress
+            if not dry_run:
+                db.commit()
+    finally:
+        db.close()
+    
+    return counts
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Migrate recordings to the sharded layout")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be moved without changing anything")
+    parser.add_argument("--batch-size", type=int, default=500, help="Rows processed per commit")
+    args = parser.parse_args(argv)
+    
+    counts = migrate(dry_run=args.dry_run, batch_size=args.batch_size)
+    prefix = "Would move" if args.dry_run else "Moved"
+    print(f"{prefix} {counts['moved']} recordings, "
+          f"{counts['already_sharded']} already sharded, {counts['missing']} missing, "
+          f"{counts['remote']} in object storage")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
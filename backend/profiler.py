@@ -0,0 +1,167 @@
+"""Opt-in per-request profiling with a bounded in-memory store."""
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+from config import settings
+
+# Client-supplied request ids are only kept if they match this
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+
+class CapturedProfile:
+    """A single captured request profile."""
+    def __init__(self, profile_id: str, request_id: Optional[str], method: str, path: str,
+                 status_code: int, duration_ms: float, stats: Dict, concurrent_requests: int = 0):
+        self.profile_id = profile_id
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.status_code = status_code
+        self.duration_ms = duration_ms
+        # Other requests in flight at any point during the capture; their
+        # coroutines ran on the same thread and appear in the stats too
+        self.concurrent_requests = concurrent_requests
+        self.created_at = datetime.utcnow()
+        # Raw cProfile stats dict, same layout pstats writes to a .prof file
+        self.stats = stats
+
+    def summary(self) -> Dict:
+        """Metadata shown in the profile listing."""
+        return {
+            "profile_id": self.profile_id,
+            "request_id": self.request_id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "duration_ms": round(self.duration_ms, 3),
+            "concurrent_requests": self.concurrent_requests,
+            "created_at": self.created_at.isoformat()
+        }
+
+    def to_prof_bytes(self) -> bytes:
+        """Serialize in the binary format read by pstats / snakeviz."""
+        return marshal.dumps(self.stats)
+
+    def to_text(self, sort_by: str = "cumulative", limit: int = 50) -> str:
+        """Render a human-readable pstats report."""
+        stream = io.StringIO()
+        stats = pstats.Stats(stream=stream)
+        stats.stats = self.stats
+        stats.get_top_level_stats()
+        stats.sort_stats(sort_by).print_stats(limit)
+        return stream.getvalue()
+
+
+class RequestProfiler:
+    """
+    Decides which requests to profile and keeps the most recent captures.
+
+    cProfile hooks only the thread that enables it, which for a request is
+    the event loop thread, and the capture stays enabled across the whole
+    await of the handler. Any other request's coroutines that run on the loop
+    meanwhile are recorded in the same profile, so each capture notes how many
+    other requests overlapped it; a capture with zero is clean. Only one
+    request is profiled at a time; requests arriving while a capture is
+    running are served unprofiled. Work in threadpool workers is not captured.
+    """
+
+    def __init__(self, enabled: bool, sample_rate: float, header_name: str, max_profiles: int):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.header_name = header_name
+        self.max_profiles = max_profiles
+        self._profiles: "OrderedDict[str, CapturedProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._active = False
+        self._in_flight = 0
+        self._overlapping = 0
+
+    def request_started(self):
+        """Count a request entering the app (called for every request while enabled)."""
+        with self._lock:
+            self._in_flight += 1
+            if self._active:
+                self._overlapping += 1
+
+    def request_finished(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def should_profile(self, headers) -> bool:
+        """Return True if this request was selected by header or sampling."""
+        if not self.enabled:
+            return False
+        if headers.get(self.header_name):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """Begin a capture, or return None if another one is in progress."""
+        with self._lock:
+            if self._active:
+                return None
+            self._active = True
+            # Requests already in flight, other than the one being profiled
+            self._overlapping = self._in_flight - 1
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger) already owns the hook
+            with self._lock:
+                self._active = False
+            return None
+        return profile
+
+    def finish(self, profile: cProfile.Profile, request_id: Optional[str], method: str,
+               path: str, status_code: int, started: float) -> str:
+        """
+        Stop a capture and store it under a new profile id, evicting the oldest
+        entry when full. The client's request id is kept for reference only.
+        """
+        profile.disable()
+        duration_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._active = False
+            concurrent_requests = self._overlapping
+        profile.create_stats()
+
+        profile_id = uuid.uuid4().hex
+        if request_id and not _REQUEST_ID_PATTERN.match(request_id):
+            request_id = None
+        captured = CapturedProfile(profile_id, request_id, method, path, status_code, duration_ms,
+                                   profile.stats, concurrent_requests)
+        with self._lock:
+            self._profiles[profile_id] = captured
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+        return profile_id
+
+    def list_profiles(self) -> List[Dict]:
+        """Return summaries of stored profiles, newest first."""
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [p.summary() for p in reversed(profiles)]
+
+    def get_profile(self, profile_id: str) -> Optional[CapturedProfile]:
+        """Look up a stored profile by profile id."""
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+
+# Global request profiler instance
+request_profiler = RequestProfiler(
+    enabled=settings.profiling_enabled,
+    sample_rate=settings.profiling_sample_rate,
+    header_name=settings.profiling_header,
+    max_profiles=settings.profiling_max_profiles
+)
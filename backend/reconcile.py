@@ -0,0 +1,293 @@
+"""Reconcile stored recording files with the recordings table.
+
+Checks that every Recording row points at a file that exists, has a valid
+WAV header and still matches its stored checksum; finds orphaned files on
+local disk that no row references; and removes stale temp uploads,
+partial streaming/re-conversion outputs and old export zips.
+
+Runs incrementally: only rows added since the last run's checkpoint are
+examined, and only shard directories modified since then are listed,
+unless --full is given. Files younger than RECONCILE_STALE_HOURS are never
+treated as orphans, since an upload's file exists before its row does.
+
+Usage:
+    python reconcile.py                 # incremental, report only
+    python reconcile.py --full          # re-verify everything
+    python reconcile.py --quarantine    # also move orphans / dangling rows aside
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from config import settings
+from database import SessionLocal, Recording, init_db
+from audio_utils import RECONVERT_SUFFIX, UPLOAD_TEMP_PREFIX, is_valid_wav_header
+from storage import SIDECAR_SUFFIXES, get_storage
+
+CHECKPOINT_PATH = settings.data_dir / "reconcile_checkpoint.json"
+QUARANTINE_DIR = settings.data_dir / "quarantine"
+
+# Margin when comparing file and directory mtimes to the checkpoint, for
+# clock skew and files still being written after their directory entry
+MTIME_MARGIN_SECONDS = 3600
+
+
+def load_checkpoint() -> Dict:
+    """Read the checkpoint left by the previous run."""
+    if CHECKPOINT_PATH.exists():
+        return json.loads(CHECKPOINT_PATH.read_text(encoding="utf-8"))
+    return {"last_recording_id": 0, "last_run_started": 0.0}
+
+
+def save_checkpoint(checkpoint: Dict):
+    """Write the checkpoint atomically."""
+    temp_path = CHECKPOINT_PATH.with_suffix(".tmp")
+    temp_path.write_text(json.dumps(checkpoint, indent=2), encoding="utf-8")
+    os.replace(temp_path, CHECKPOINT_PATH)
+
+
+def check_recording(rec_id: int, locator: str, expected_sha256: Optional[str]) -> Dict:
+    """Verify one recording's file: existence, WAV header and checksum."""
+    result = {"id": rec_id, "file_path": locator, "status": "ok", "sha256": None}
+    try:
+        storage = get_storage(locator)
+        if not storage.exists(locator):
+            result["status"] = "missing"
+            return result
+
+        digest = hashlib.sha256()
+        header = b""
+        for chunk in storage.iter_chunks(locator):
+            if len(header) < 44:
+                header += chunk[:44 - len(header)]
+            digest.update(chunk)
+    except Exception as e:
+        result["status"] = "unreadable"
+        result["error"] = str(e)
+        return result
+
+    result["sha256"] = digest.hexdigest()
+    if not is_valid_wav_header(header):
+        result["status"] = "bad_header"
+    elif expected_sha256 and expected_sha256 != result["sha256"]:
+        result["status"] = "checksum_mismatch"
+    return result
+
+
+def scan_rows(db, since_id: int, workers: int, batch_size: int = 500) -> Dict:
+    """Check rows with id > since_id, storing checksums for newly verified files."""
+    problems: List[Dict] = []
+    checked = 0
+    last_id = since_id
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            rows = (
+                db.query(Recording)
+                .filter(Recording.id > last_id)
+                .order_by(Recording.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+
+            results = pool.map(lambda rec: check_recording(rec.id, rec.file_path, rec.sha256), rows)
+            for rec, result in zip(rows, results):
+                checked += 1
+                if result["status"] == "ok":
+                    if not rec.sha256:
+                        rec.sha256 = result["sha256"]
+                else:
+                    problems.append(result)
+            last_id = rows[-1].id
+            db.commit()
+
+    return {"checked": checked, "problems": problems, "last_recording_id": last_id}
+
+
+def _changed_files(modified_since: float) -> Iterator[Path]:
+    """
+    Files under the local recordings directory in directories modified
+    since modified_since. Adding, renaming or removing a file updates its
+    directory's mtime, so a leaf shard directory older than that cannot
+    hold anything new and is not listed at all. Upper shard levels only
+    hold directories and are always listed.
+    """
+    pending = [(settings.recordings_dir, 0)]
+    while pending:
+        directory, depth = pending.pop()
+        try:
+            changed = directory.stat().st_mtime >= modified_since
+            if depth >= settings.recordings_shard_depth and not changed:
+                continue
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                pending.append((Path(entry.path), depth + 1))
+            elif changed and entry.is_file(follow_symlinks=False):
+                yield Path(entry.path)
+
+
+def find_orphans(db, modified_since: float) -> Dict:
+    """
+    Find WAVs no row references, and stale partial outputs, among local
+    files in directories modified since modified_since.
+
+    A WAV is only an orphan candidate once it is older than
+    reconcile_stale_hours: a file being converted or streamed exists
+    before its row is committed.
+    """
+    stale_before = time.time() - settings.reconcile_stale_hours * 3600
+    candidates: List[Path] = []
+    stale: List[Path] = []
+
+    for path in _changed_files(modified_since):
+        name = path.name
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            continue
+        if mtime >= stale_before:
+            continue
+        # .reconvert.wav: temp outputs left by older versions of reconvert_recordings.py
+        if name.endswith((".part", RECONVERT_SUFFIX, ".reconvert.wav")):
+            stale.append(path)
+        elif name.endswith(".wav") and mtime >= modified_since:
+            candidates.append(path)
+
+    orphans: List[Path] = []
+    for start in range(0, len(candidates), 500):
+        batch = candidates[start:start + 500]
+        known = {
+            row.file_path for row in
+            db.query(Recording.file_path).filter(Recording.file_path.in_([str(p) for p in batch])).all()
+        }
+        orphans.extend(p for p in batch if str(p) not in known)
+
+    return {"orphans": orphans, "stale": stale}
+
+
+def find_stale_artifacts() -> List[Path]:
+    """Temp uploads and export zips older than reconcile_stale_hours."""
+    stale_before = time.time() - settings.reconcile_stale_hours * 3600
+    paths = list(Path(tempfile.gettempdir()).glob(f"{UPLOAD_TEMP_PREFIX}*"))
+    paths += list(settings.data_dir.glob("recordings_*.zip"))
+    stale = []
+    for path in paths:
+        try:
+            if path.stat().st_mtime < stale_before:
+                stale.append(path)
+        except FileNotFoundError:
+            continue
+    return stale
+
+
+def quarantine(db, orphans: List[Path], dangling: List[Dict]) -> Dict:
+    """Move orphaned files and missing-file rows into the quarantine directory."""
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    target_dir = QUARANTINE_DIR / stamp
+    target_dir.mkdir(parents=True, exist_ok=True)
+
+    for path in orphans:
+        destination = target_dir / "files" / path.relative_to(settings.recordings_dir)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, destination)
+        for suffix in SIDECAR_SUFFIXES:
+            sidecar = Path(str(path) + suffix)
+            if sidecar.exists():
+                os.replace(sidecar, Path(str(destination) + suffix))
+
+    if dangling:
+        # Keep the full rows so they can be restored, then delete them
+        ids = [problem["id"] for problem in dangling]
+        rows = db.query(Recording).filter(Recording.id.in_(ids)).all()
+        with open(target_dir / "dangling_rows.jsonl", "w", encoding="utf-8") as f:
+            for rec in rows:
+                f.write(json.dumps({
+                    "id": rec.id,
+                    "username": rec.username,
+                    "language": rec.language,
+                    "task_type": rec.task_type,
+                    "role": rec.role,
+                    "item_id": rec.item_id,
+                    "file_path": rec.file_path,
+                    "created_at": rec.created_at.isoformat() if rec.created_at else None,
+                    "idempotency_key": rec.idempotency_key,
+                    "sha256": rec.sha256,
+                    "fingerprint": rec.fingerprint
+                }, ensure_ascii=False) + "\n")
+                db.delete(rec)
+        db.commit()
+
+    return {"quarantine_dir": str(target_dir), "files": len(orphans), "rows": len(dangling)}
+
+
+def reconcile(full: bool = False, do_quarantine: bool = False, workers: int = None) -> Dict:
+    """Run one reconciliation pass and return a report."""
+    init_db()
+    checkpoint = {"last_recording_id": 0, "last_run_started": 0.0} if full else load_checkpoint()
+    started = time.time()
+
+    db = SessionLocal()
+    try:
+        rows = scan_rows(db, checkpoint["last_recording_id"], workers or settings.reconcile_workers)
+        # Orphan checks wait until files are reconcile_stale_hours old, so the
+        # files to look at are those that reached that age since the last run
+        grace_seconds = settings.reconcile_stale_hours * 3600
+        modified_since = 0.0 if full else checkpoint["last_run_started"] - grace_seconds - MTIME_MARGIN_SECONDS
+        files = find_orphans(db, modified_since)
+        stale = files["stale"] + find_stale_artifacts()
+
+        for path in stale:
+            if path.exists():
+                path.unlink()
+
+        dangling = [p for p in rows["problems"] if p["status"] == "missing"]
+        quarantined = None
+        if do_quarantine and (files["orphans"] or dangling):
+            quarantined = quarantine(db, files["orphans"], dangling)
+    finally:
+        db.close()
+
+    save_checkpoint({
+        "last_recording_id": rows["last_recording_id"],
+        "last_run_started": started,
+        "updated_at": datetime.utcnow().isoformat()
+    })
+
+    return {
+        "mode": "full" if full else "incremental",
+        "rows_checked": rows["checked"],
+        "problems": rows["problems"],
+        "orphans": [str(p) for p in files["orphans"]],
+        "stale_removed": [str(p) for p in stale],
+        "quarantined": quarantined,
+        "elapsed_seconds": round(time.time() - started, 3)
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Reconcile recording files with the database")
+    parser.add_argument("--full", action="store_true", help="Ignore the checkpoint and re-verify everything")
+    parser.add_argument("--quarantine", action="store_true", help="Move orphaned files and missing-file rows aside")
+    parser.add_argument("--workers", type=int, default=None, help="Checksum threads (default: RECONCILE_WORKERS)")
+    args = parser.parse_args(argv)
+
+    report = reconcile(full=args.full, do_quarantine=args.quarantine, workers=args.workers)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 1 if report["problems"] or report["orphans"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
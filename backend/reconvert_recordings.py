@@ -0,0 +1,82 @@
+"""Re-convert stored recordings to the current WAV format in batches.
+
+Backfill job for when the output format (audio_utils.WAV_OUTPUT_ARGS)
+changes or files need repairing. Only recordings on local storage are
+processed. Files are converted many per ffmpeg invocation into temporary
+.reconvert.tmp files (not .wav, so reconcile.py never mistakes them for
+recordings) and replaced in place only after a successful conversion.
+
+Usage:
+    python reconvert_recordings.py                  # all recordings
+    python reconvert_recordings.py --username alice --batch-size 16
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from database import SessionLocal, Recording, init_db
+from audio_utils import RECONVERT_SUFFIX, convert_batch_to_wav
+from storage import local_storage
+
+
+def reconvert(username: str = None, batch_size: int = 16) -> dict:
+    """Re-convert recordings and return counts of converted, failed and missing files."""
+    counts = {"converted": 0, "failed": 0, "missing": 0}
+    init_db()
+    db = SessionLocal()
+    try:
+        query = db.query(Recording.id, Recording.file_path).order_by(Recording.id)
+        if username:
+            query = query.filter(Recording.username == username)
+        rows = query.all()
+    finally:
+        db.close()
+    
+    paths = []
+    for rec_id, file_path in rows:
+        if not local_storage.handles(file_path):
+            continue
+        path = Path(file_path)
+        if path.exists():
+            paths.append(path)
+        else:
+            print(f"Missing file for recording {rec_id}: {path}")
+            counts["missing"] += 1
+    
+    for start in range(0, len(paths), batch_size):
+        batch = paths[start:start + batch_size]
+        jobs = [(path, path.with_name(path.name + RECONVERT_SUFFIX)) for path in batch]
+        results = convert_batch_to_wav(jobs)
+        
+        for (path, temp_output), (success, message) in zip(jobs, results):
+            if success:
+                os.replace(temp_output, path)
+                counts["converted"] += 1
+            else:
+                if temp_output.exists():
+                    temp_output.unlink()
+                print(f"Failed to convert {path}: {message}")
+                counts["failed"] += 1
+    
+    return counts
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Re-convert stored recordings in batches")
+    parser.add_argument("--username", default=None, help="Only re-convert this user's recordings")
+    parser.add_argument("--batch-size", type=int, default=16, help="Files per ffmpeg invocation")
+    args = parser.parse_args(argv)
+    
+    start = time.perf_counter()
+    counts = reconvert(username=args.username, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"Converted {counts['converted']} recordings in {elapsed:.1f}s, "
+          f"{counts['failed']} failed, {counts['missing']} missing")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""Storage backends for recording files."""
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterator, Optional
+from config import settings
+
+# Chunk size used when streaming files out of storage
+CHUNK_SIZE = 1024 * 1024
+
+# Derived files kept beside a recording (locator + suffix), removed with it
+PEAKS_SUFFIX = ".peaks.json"
+SIDECAR_SUFFIXES = [PEAKS_SUFFIX]
+
+
+class RecordingStorage(ABC):
+    """
+    Interface for where converted recordings live.
+
+    A backend stores a local file under a key (its path relative to the
+    recordings directory) and returns a locator string that is saved in
+    Recording.file_path. Locators identify their backend, so rows written
+    under different backends can coexist.
+    """
+
+    @abstractmethod
+    def handles(self, locator: str) -> bool:
+        """Return True if this backend owns the given locator."""
+
+    @abstractmethod
+    def store(self, local_path: Path, key: str) -> str:
+        """Move a local file into storage and return its locator."""
+
+    @abstractmethod
+    def exists(self, locator: str) -> bool:
+        """
+        Return True if the recording file is present, False if it is not.
+        Raises if the backend cannot tell (e.g. permissions or throttling).
+        """
+
+    @abstractmethod
+    def size(self, locator: str) -> int:
+        """Return the recording's size in bytes."""
+
+    @abstractmethod
+    def delete(self, locator: str):
+        """Remove a recording and its sidecar files."""
+
+    @abstractmethod
+    def iter_chunks(self, locator: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Yield the file's bytes from start up to and including end."""
+
+    @abstractmethod
+    def write_sidecar(self, locator: str, suffix: str, data: bytes):
+        """Store a small derived file beside the recording."""
+
+    @abstractmethod
+    def read_sidecar(self, locator: str, suffix: str) -> Optional[bytes]:
+        """Read a sidecar file, or None if it does not exist."""
+
+
+class LocalStorage(RecordingStorage):
+    """Recordings on the local (persistent) disk; locators are absolute paths."""
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+
+    def handles(self, locator: str) -> bool:
+        return "://" not in locator
+
+    def store(self, local_path: Path, key: str) -> str:
+        target = self.base_dir / key
+        if local_path != target:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(local_path, target)
+        return str(target)
+
+    def exists(self, locator: str) -> bool:
+        return Path(locator).exists()
+
+    def size(self, locator: str) -> int:
+        return Path(locator).stat().st_size
+
+    def delete(self, locator: str):
+        for path in [Path(locator)] + [Path(locator + suffix) for suffix in SIDECAR_SUFFIXES]:
+            if path.exists():
+                path.unlink()
+
+    def write_sidecar(self, locator: str, suffix: str, data: bytes):
+        Path(locator + suffix).write_bytes(data)
+
+    def read_sidecar(self, locator: str, suffix: str) -> Optional[bytes]:
+        path = Path(locator + suffix)
+        return path.read_bytes() if path.exists() else None
+
+    def iter_chunks(self, locator: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        with open(locator, "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = f.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+
+class S3Storage(RecordingStorage):
+    """
+    Recordings in an S3-compatible bucket; locators are s3://bucket/key.
+
+    Uses one pooled boto3 client, and multipart uploads for files above
+    the configured threshold. Point endpoint_url at MinIO or moto_server
+    to run against a local stand-in.
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, access_key_id: Optional[str] = None,
+                 secret_access_key: Optional[str] = None, max_pool_connections: int = 20,
+                 multipart_threshold_mb: int = 8):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+            from botocore.config import Config
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3. Install it with: pip install boto3")
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            aws_access_key_id=access_key_id or None,
+            aws_secret_access_key=secret_access_key or None,
+            config=Config(max_pool_connections=max_pool_connections, retries={"mode": "standard"})
+        )
+        threshold = multipart_threshold_mb * 1024 * 1024
+        self.transfer_config = TransferConfig(
+            multipart_threshold=threshold,
+            multipart_chunksize=threshold,
+            max_concurrency=max(1, max_pool_connections // 2)
+        )
+
+    def ensure_bucket(self):
+        """Create the bucket if it does not exist (useful with a local stand-in)."""
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_bucket(Bucket=self.bucket)
+        except ClientError:
+            self.client.create_bucket(Bucket=self.bucket)
+
+    @staticmethod
+    def _is_not_found(error) -> bool:
+        """True for a missing object; throttling, permission and server errors are not."""
+        return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    def _key(self, locator: str) -> str:
+        return locator[len(f"s3://{self.bucket}/"):]
+
+    def handles(self, locator: str) -> bool:
+        return locator.startswith(f"s3://{self.bucket}/")
+
+    def store(self, local_path: Path, key: str) -> str:
+        object_key = f"{self.prefix}/{key}" if self.prefix else key
+        self.client.upload_file(str(local_path), self.bucket, object_key, Config=self.transfer_config)
+        local_path.unlink()
+        return f"s3://{self.bucket}/{object_key}"
+
+    def exists(self, locator: str) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(locator))
+            return True
+        except ClientError as e:
+            if self._is_not_found(e):
+                return False
+            raise
+
+    def size(self, locator: str) -> int:
+        return self.client.head_object(Bucket=self.bucket, Key=self._key(locator))["ContentLength"]
+
+    def delete(self, locator: str):
+        key = self._key(locator)
+        for object_key in [key] + [key + suffix for suffix in SIDECAR_SUFFIXES]:
+            self.client.delete_object(Bucket=self.bucket, Key=object_key)
+
+    def write_sidecar(self, locator: str, suffix: str, data: bytes):
+        self.client.put_object(Bucket=self.bucket, Key=self._key(locator) + suffix, Body=data)
+
+    def read_sidecar(self, locator: str, suffix: str) -> Optional[bytes]:
+        from botocore.exceptions import ClientError
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._key(locator) + suffix)
+        except ClientError as e:
+            if self._is_not_found(e):
+                return None
+            raise
+        return response["Body"].read()
+
+    def iter_chunks(self, locator: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        byte_range = f"bytes={start}-{'' if end is None else end}"
+        response = self.client.get_object(Bucket=self.bucket, Key=self._key(locator), Range=byte_range)
+        yield from response["Body"].iter_chunks(CHUNK_SIZE)
+
+
+def _create_default_storage() -> RecordingStorage:
+    """Build the backend selected by settings.storage_backend."""
+    if settings.storage_backend == "local":
+        return local_storage
+    if settings.storage_backend == "s3":
+        if not settings.storage_s3_bucket:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires STORAGE_S3_BUCKET")
+        return S3Storage(
+            bucket=settings.storage_s3_bucket,
+            prefix=settings.storage_s3_prefix,
+            endpoint_url=settings.storage_s3_endpoint_url,
+            region=settings.storage_s3_region,
+            access_key_id=settings.storage_s3_access_key_id,
+            secret_access_key=settings.storage_s3_secret_access_key,
+            max_pool_connections=settings.storage_s3_max_pool_connections,
+            multipart_threshold_mb=settings.storage_s3_multipart_threshold_mb
+        )
+    raise RuntimeError(f"Unknown storage backend: {settings.storage_backend}")
+
+
+def recording_key(local_path: Path) -> str:
+    """Storage key for a file under the recordings directory (its sharded relative path)."""
+    return local_path.relative_to(settings.recordings_dir).as_posix()
+
+
+def get_storage(locator: str) -> RecordingStorage:
+    """Return the backend holding the file with this locator."""
+    if recording_storage.handles(locator):
+        return recording_storage
+    if local_storage.handles(locator):
+        return local_storage
+    raise ValueError(f"No configured storage backend for {locator}")
+
+
+# Local storage is always available for files written before switching backends
+local_storage = LocalStorage(settings.recordings_dir)
+
+# Global storage instance for new recordings
+recording_storage = _create_default_storage()
@@ -0,0 +1,93 @@
+"""S3Storage against moto's in-process S3 (pip install pytest "moto[s3]")."""
+import pytest
+
+botocore_exceptions = pytest.importorskip("botocore.exceptions")
+moto = pytest.importorskip("moto")
+
+from storage import PEAKS_SUFFIX, S3Storage
+
+BUCKET = "voxprivacy-test"
+
+
+@pytest.fixture
+def s3_storage(monkeypatch):
+    for name, value in {
+        "AWS_ACCESS_KEY_ID": "testing",
+        "AWS_SECRET_ACCESS_KEY": "testing",
+        "AWS_DEFAULT_REGION": "us-east-1",
+    }.items():
+        monkeypatch.setenv(name, value)
+    with moto.mock_aws():
+        storage = S3Storage(bucket=BUCKET, prefix="recordings", region="us-east-1", multipart_threshold_mb=5)
+        storage.ensure_bucket()
+        yield storage
+
+
+def _store(storage, tmp_path, data: bytes, key: str = "ab/cd/alice_zh_pair_1_secret.wav") -> str:
+    local_path = tmp_path / "upload.wav"
+    local_path.write_bytes(data)
+    locator = storage.store(local_path, key)
+    assert not local_path.exists()
+    return locator
+
+
+def test_store_returns_locator_under_prefix(s3_storage, tmp_path):
+    locator = _store(s3_storage, tmp_path, b"RIFF0000WAVE")
+
+    assert locator == f"s3://{BUCKET}/recordings/ab/cd/alice_zh_pair_1_secret.wav"
+    assert s3_storage.handles(locator)
+    assert not s3_storage.handles("s3://other-bucket/recordings/x.wav")
+    assert not s3_storage.handles("/app/data/recordings/x.wav")
+
+
+def test_exists_size_and_full_read(s3_storage, tmp_path):
+    data = bytes(range(256)) * 100
+    locator = _store(s3_storage, tmp_path, data)
+
+    assert s3_storage.exists(locator)
+    assert not s3_storage.exists(f"s3://{BUCKET}/recordings/missing.wav")
+    assert s3_storage.size(locator) == len(data)
+    assert b"".join(s3_storage.iter_chunks(locator)) == data
+
+
+def test_byte_ranges_are_inclusive(s3_storage, tmp_path):
+    data = bytes(range(256)) * 100
+    locator = _store(s3_storage, tmp_path, data)
+
+    assert b"".join(s3_storage.iter_chunks(locator, 10, 19)) == data[10:20]
+    assert b"".join(s3_storage.iter_chunks(locator, 25000)) == data[25000:]
+
+
+def test_multipart_upload_round_trips(s3_storage, tmp_path):
+    data = bytes(range(256)) * (6 * 1024 * 4)  # 6 MiB, above the 5 MiB threshold
+    locator = _store(s3_storage, tmp_path, data)
+
+    assert s3_storage.size(locator) == len(data)
+    assert b"".join(s3_storage.iter_chunks(locator)) == data
+
+
+def test_sidecars_are_read_back_and_deleted_with_recording(s3_storage, tmp_path):
+    locator = _store(s3_storage, tmp_path, b"RIFF0000WAVE")
+
+    assert s3_storage.read_sidecar(locator, PEAKS_SUFFIX) is None
+    s3_storage.write_sidecar(locator, PEAKS_SUFFIX, b'{"peaks": []}')
+    assert s3_storage.read_sidecar(locator, PEAKS_SUFFIX) == b'{"peaks": []}'
+
+    s3_storage.delete(locator)
+    assert not s3_storage.exists(locator)
+    assert s3_storage.read_sidecar(locator, PEAKS_SUFFIX) is None
+
+
+def test_errors_other_than_not_found_are_raised(s3_storage, tmp_path, monkeypatch):
+    locator = _store(s3_storage, tmp_path, b"RIFF0000WAVE")
+
+    def denied(**kwargs):
+        raise botocore_exceptions.ClientError({"Error": {"Code": "403", "Message": "Forbidden"}}, "HeadObject")
+
+    # A missing object is reported as such, but an unreadable bucket is not "missing"
+    monkeypatch.setattr(s3_storage.client, "head_object", denied)
+    monkeypatch.setattr(s3_storage.client, "get_object", denied)
+    with pytest.raises(botocore_exceptions.ClientError):
+        s3_storage.exists(locator)
+    with pytest.raises(botocore_exceptions.ClientError):
+        s3_storage.read_sidecar(locator, PEAKS_SUFFIX)
@@ -3,13 +3,18 @@
  */
 import { useState, useRef, useEffect } from 'react';
 import type { RecordingState } from '../types';
+import type { RecordingStream } from '../services/api';
+
+// MediaRecorder timeslice when streaming, so chunks reach the server while recording
+const STREAM_TIMESLICE_MS = 250;
 
 interface RecordingControlsProps {
-  onRecordingComplete: (audioBlob: Blob) => void;
+  onRecordingComplete: (audioBlob: Blob, takeId: string, stream: RecordingStream | null) => void;
+  openStream?: (takeId: string) => RecordingStream | null;
   disabled?: boolean;
 }
 
-export default function RecordingControls({ onRecordingComplete, disabled = false }: RecordingControlsProps) {
+export default function RecordingControls({ onRecordingComplete, openStream, disabled = false }: RecordingControlsProps) {
   const [recordingState, setRecordingState] = useState<RecordingState>({
     isRecording: false,
     audioBlob: null,
@@ -20,6 +25,9 @@ export default function RecordingControls({ onRecordingComplete, disabled = fals
 
   const mediaRecorderRef = useRef<MediaRecorder | null>(null);
   const audioChunksRef = useRef<Blob[]>([]);
+  // Unique id per take, sent as the upload's idempotency key
+  const takeIdRef = useRef<string>('');
+  const streamRef = useRef<RecordingStream | null>(null);
   const timerRef = useRef<number | null>(null);
 
   // Cleanup on unmount
@@ -31,12 +39,14 @@ export default function RecordingControls({ onRecordingComplete, disabled = fals
       if (recordingState.audioUrl) {
         URL.revokeObjectURL(recordingState.audioUrl);
       }
+      streamRef.current?.cancel();
     };
   }, []);
 
   const startRecording = async () => {
     setError(null);
     audioChunksRef.current = [];
+    takeIdRef.current = crypto.randomUUID();
     setRecordingTime(0);
 
     try {
@@ -50,10 +60,15 @@ export default function RecordingControls({ onRecordingComplete, disabled = fals
 
       mediaRecorderRef.current = mediaRecorder;
 
+      // Stream chunks to the server while recording, if supported by the caller
+      streamRef.current?.cancel();
+      streamRef.current = openStream ? openStream(takeIdRef.current) : null;
+
       // Collect audio chunks
       mediaRecorder.ondataavailable = (event) => {
         if (event.data.size > 0) {
           audioChunksRef.current.push(event.data);
+          streamRef.current?.sendChunk(event.data);
         }
       };
 
@@ -68,6 +83,9 @@ export default function RecordingControls({ onRecordingComplete, disabled = fals
           audioUrl,
         });
 
+        // Let the server finish the WAV while the user reviews the take
+        streamRef.current?.end();
+
         // Stop all tracks
         stream.getTracks().forEach(track => track.stop());
 
@@ -79,7 +97,7 @@ export default function RecordingControls({ onRecordingComplete, disabled = fals
       };
 
       // Start recording
-      mediaRecorder.start();
+      mediaRecorder.start(streamRef.current ? STREAM_TIMESLICE_MS : undefined);
 
       setRecordingState(prev => ({
         ...prev,
@@ -114,7 +132,8 @@ export default function RecordingControls({ onRecordingComplete, disabled = fals
 
   const submitRecording = () => {
     if (recordingState.audioBlob) {
-      onRecordingComplete(recordingState.audioBlob);
+      onRecordingComplete(recordingState.audioBlob, takeIdRef.current, streamRef.current);
+      streamRef.current = null;
       // Reset state
       setRecordingState({
         isRecording: false,
@@ -129,6 +148,8 @@ export default function RecordingControls({ onRecordingComplete, disabled = fals
     if (recordingState.audioUrl) {
       URL.revokeObjectURL(recordingState.audioUrl);
     }
+    streamRef.current?.cancel();
+    streamRef.current = null;
     setRecordingState({
       isRecording: false,
       audioBlob: null,
@@ -2,7 +2,8 @@
  * Main recording screen component.
  */
 import { useState, useEffect } from 'react';
-import { getNextTask, uploadRecording, ApiError } from '../services/api';
+import { getNextTask, uploadRecording, openRecordingStream, ApiError } from '../services/api';
+import type { RecordingStream } from '../services/api';
 import type { Progress, Task } from '../types';
 import ProgressBar from './ProgressBar';
 import RecordingControls from './RecordingControls';
@@ -51,22 +52,38 @@ export default function RecordingScreen({ username, initialProgress, onLogout }:
     }
   };
 
-  const handleRecordingComplete = async (audioBlob: Blob) => {
+  const openStream = (takeId: string): RecordingStream | null => {
+    if (!currentTask) return null;
+    return openRecordingStream(
+      username,
+      currentTask.language,
+      currentTask.task_type,
+      currentTask.role,
+      currentTask.item_id,
+      takeId
+    );
+  };
+
+  const handleRecordingComplete = async (audioBlob: Blob, takeId: string, stream: RecordingStream | null) => {
     if (!currentTask) return;
 
     setUploading(true);
     setError(null);
     setSuccessMessage(null);
 
+    const upload = () => uploadRecording(
+      username,
+      currentTask.language,
+      currentTask.task_type,
+      currentTask.role,
+      currentTask.item_id,
+      audioBlob,
+      takeId
+    );
+
     try {
-      const response = await uploadRecording(
-        username,
-        currentTask.language,
-        currentTask.task_type,
-        currentTask.role,
-        currentTask.item_id,
-        audioBlob
-      );
+      // Prefer the live stream (already converted); fall back to a regular upload
+      const response = stream ? await stream.commit().catch(upload) : await upload();
 
       setProgress(response.progress);
       setSuccessMessage('Recording uploaded successfully! Loading next task...');
@@ -213,6 +230,7 @@ export default function RecordingScreen({ username, initialProgress, onLogout }:
 
           <RecordingControls
             onRecordingComplete={handleRecordingComplete}
+            openStream={openStream}
             disabled={uploading}
           />
 
@@ -64,8 +64,32 @@ export async function getNextTask(username: string): Promise<NextTaskResponse> {
   }
 }
 
+const UPLOAD_MAX_ATTEMPTS = 5;
+const DEFAULT_RETRY_AFTER_SECONDS = 2;
+
+/**
+ * Wait for the given number of milliseconds.
+ */
+function sleep(ms: number): Promise<void> {
+  return new Promise(resolve => setTimeout(resolve, ms));
+}
+
+/**
+ * Compute the delay before retrying a 429 response.
+ * Honors the server's Retry-After and adds up to 50% random jitter so that
+ * clients rejected together do not all retry at the same moment.
+ */
+function retryDelayMs(error: AxiosError): number {
+  const header = error.response?.headers?.['retry-after'];
+  const seconds = Number(header);
+  const base = (Number.isFinite(seconds) && seconds > 0 ? seconds : DEFAULT_RETRY_AFTER_SECONDS) * 1000;
+  return base + Math.random() * base * 0.5;
+}
+
 /**
  * Upload a recording to the backend.
+ * Retries with jittered backoff when the server is busy (HTTP 429).
+ * The idempotency key (one per take) lets the server collapse repeated attempts.
  */
 export async function uploadRecording(
   username: string,
@@ -73,7 +97,8 @@ export async function uploadRecording(
   taskType: string,
   role: string,
   itemId: string,
-  audioBlob: Blob
+  audioBlob: Blob,
+  idempotencyKey?: string
 ): Promise<UploadResponse> {
   try {
     const formData = new FormData();
@@ -84,15 +109,152 @@ export async function uploadRecording(
     formData.append('item_id', itemId);
     formData.append('audio', audioBlob, 'recording.webm');
     
-    const response = await api.post<UploadResponse>('/api/upload_recording', formData, {
-      headers: { 'Content-Type': 'multipart/form-data' },
-    });
-    return response.data;
+    for (let attempt = 1; ; attempt++) {
+      try {
+        const response = await api.post<UploadResponse>('/api/upload_recording', formData, {
+          headers: {
+            'Content-Type': 'multipart/form-data',
+            ...(idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {}),
+          },
+        });
+        return response.data;
+      } catch (error) {
+        if (!axios.isAxiosError(error) || error.response?.status !== 429 || attempt >= UPLOAD_MAX_ATTEMPTS) {
+          throw error;
+        }
+        await sleep(retryDelayMs(error));
+      }
+    }
   } catch (error) {
     handleApiError(error);
   }
 }
 
+/**
+ * Live upload of a recording over WebSocket.
+ *
+ * MediaRecorder chunks are sent while recording, so the server has the WAV
+ * ready by the time the user stops; commit() then only stores the metadata.
+ */
+export class RecordingStream {
+  private socket: WebSocket;
+  private error: string | null = null;
+  private closed = false;
+  private commitResult: {
+    resolve: (response: UploadResponse) => void;
+    reject: (error: ApiError) => void;
+  } | null = null;
+
+  constructor(url: string) {
+    this.socket = new WebSocket(url);
+    this.socket.binaryType = 'arraybuffer';
+    this.socket.onmessage = (event) => this.handleMessage(event);
+    this.socket.onerror = () => this.fail('Streaming connection failed');
+    this.socket.onclose = () => {
+      this.closed = true;
+      this.fail('Streaming connection closed');
+    };
+  }
+
+  private handleMessage(event: MessageEvent) {
+    const message = JSON.parse(event.data);
+    if (message.type === 'error') {
+      this.fail(message.detail || 'Streaming upload failed', message.status);
+    } else if (message.type === 'committed' && this.commitResult) {
+      const response = { ...message };
+      delete response.type;
+      this.commitResult.resolve(response as UploadResponse);
+      this.commitResult = null;
+    }
+  }
+
+  private fail(message: string, statusCode?: number) {
+    if (!this.error) {
+      this.error = message;
+    }
+    if (this.commitResult) {
+      this.commitResult.reject(new ApiError(this.error, statusCode));
+      this.commitResult = null;
+    }
+  }
+
+  /**
+   * Send data once the socket is open; messages sent earlier are queued in order.
+   */
+  private send(data: Blob | string) {
+    if (this.closed || this.error) {
+      return;
+    }
+    if (this.socket.readyState === WebSocket.OPEN) {
+      this.socket.send(data);
+    } else if (this.socket.readyState === WebSocket.CONNECTING) {
+      this.socket.addEventListener('open', () => this.socket.send(data), { once: true });
+    }
+  }
+
+  /**
+   * Forward one MediaRecorder chunk.
+   */
+  sendChunk(chunk: Blob) {
+    this.send(chunk);
+  }
+
+  /**
+   * Signal that recording stopped so the server can finish the WAV.
+   */
+  end() {
+    this.send(JSON.stringify({ type: 'end' }));
+  }
+
+  /**
+   * Store the streamed recording. Rejects if the stream failed at any point,
+   * in which case the caller should fall back to uploadRecording().
+   */
+  commit(): Promise<UploadResponse> {
+    return new Promise((resolve, reject) => {
+      if (this.error || this.closed) {
+        reject(new ApiError(this.error || 'Streaming connection closed'));
+        return;
+      }
+      this.commitResult = { resolve, reject };
+      this.send(JSON.stringify({ type: 'commit' }));
+    });
+  }
+
+  /**
+   * Discard the take.
+   */
+  cancel() {
+    this.send(JSON.stringify({ type: 'cancel' }));
+    this.socket.close();
+  }
+}
+
+/**
+ * Open a live streaming upload for one take.
+ * The take id doubles as the idempotency key, so a fallback upload of the
+ * same take can never create a second recording.
+ */
+export function openRecordingStream(
+  username: string,
+  language: string,
+  taskType: string,
+  role: string,
+  itemId: string,
+  takeId: string
+): RecordingStream {
+  const params = new URLSearchParams({
+    username,
+    language,
+    task_type: taskType,
+    role,
+    item_id: itemId,
+    take_id: takeId,
+  });
+  const wsBaseUrl = API_BASE_URL.replace(/^http/, 'ws');
+  return new RecordingStream(`${wsBaseUrl}/api/stream_recording?${params.toString()}`);
+}
+
 /**
  * Test backend connection.
  */